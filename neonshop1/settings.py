@@ -53,6 +53,7 @@ TEMPLATES = [{
             "django.template.context_processors.request",
             "django.contrib.auth.context_processors.auth",
             "django.contrib.messages.context_processors.messages",
+            "store.context_processors.mini_cart",
         ],
     },
 }]
@@ -87,6 +88,9 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 
+# Flash messages ride in their own cookie and never dirty the session
+MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+
 # Email (console for dev)
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = "no-reply@neonshop.local"
@@ -104,6 +108,8 @@ STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
 PAYPAL_CLIENT_ID = os.getenv("PAYPAL_CLIENT_ID", "")
 PAYPAL_SECRET = os.getenv("PAYPAL_SECRET", "")
 COINBASE_API_KEY = os.getenv("COINBASE_API_KEY", "")
+COINBASE_WEBHOOK_SECRET = os.getenv("COINBASE_WEBHOOK_SECRET", "")
+PAYPAL_WEBHOOK_TOKEN = os.getenv("PAYPAL_WEBHOOK_TOKEN", "")  # shared secret in the webhook URL (?token=)
 
 
 DEBUG = False
@@ -146,3 +152,58 @@ else:
             "NAME": BASE_DIR / "db.sqlite3",
         }
     }
+
+
+# Cache: generation counters (catalog/product versions) must be shared by every
+# gunicorn worker, so use Redis when REDIS_URL is set (needs the `redis` package).
+REDIS_URL = os.getenv("REDIS_URL")
+
+# The cache must be shared by every process: catalog/product generations, the
+# cached product payloads and cart badges are bumped from management commands
+# and other workers. Redis if configured, otherwise a table in the main DB
+# (created by store migration 0015); never per-process LocMem. Production needs
+# REDIS_URL: on the table fallback every cache read is a database query, so
+# "a cache hit costs no queries" only holds with Redis.
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "neonshop_cache",
+            # Django's default of 300 entries would cull product payloads, cart
+            # badges and sessions all the time; every set still runs a COUNT(*)
+            "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", "100000"))},
+        }
+    }
+
+# Sessions: cached_db only saves queries when the cache is Redis; on the
+# DatabaseCache fallback it just moves the reads to the neonshop_cache table
+# (see `manage.py bench_session_writes`), so plain db sessions are the default
+# there. SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies keeps
+# (anonymous) sessions and their compact carts entirely client-side.
+SESSION_ENGINE = os.getenv(
+    "SESSION_ENGINE",
+    "django.contrib.sessions.backends.cached_db" if REDIS_URL else "django.contrib.sessions.backends.db",
+)
+
+# Catalog HTTP caching: ETags change with the catalog generation and the deploy,
+# the CDN may keep anonymous catalog pages for CATALOG_CDN_MAX_AGE seconds.
+RELEASE = os.getenv("RENDER_GIT_COMMIT", "dev")[:12]
+CATALOG_CDN_MAX_AGE = int(os.getenv("CATALOG_CDN_MAX_AGE", "60"))
+CATALOG_CDN_STALE = int(os.getenv("CATALOG_CDN_STALE", "300"))
+
+# Stock reservations: minutes a cart/order may hold units before the sweeper releases them
+STOCK_HOLD_MINUTES = int(os.getenv("STOCK_HOLD_MINUTES", "15"))
+
+# Housekeeping (manage.py purge_stale): retention windows in days
+CART_RETENTION_DAYS = int(os.getenv("CART_RETENTION_DAYS", "30"))
+INVITE_RETENTION_DAYS = int(os.getenv("INVITE_RETENTION_DAYS", "30"))
+
+# Rendered invite QR codes (content-addressed, safe to wipe at any time)
+QR_CACHE_DIR = MEDIA_ROOT / "qr"
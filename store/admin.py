@@ -1,12 +1,22 @@
 # store/admin.py
+from datetime import timedelta
+
 from django.contrib import admin
 from django.contrib.admin.sites import NotRegistered
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Sum
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 
 from .models import (
     Product, ProductImage, Variant,
     Heart, Cart, CartItem, Order, OrderItem, Payment,
-    QRInvite, Coupon,
+    QRInvite, Coupon, SalesRollup, WebhookEvent, Job,
 )
 
 # If Product was registered elsewhere, unregister first to avoid AlreadyRegistered
@@ -16,6 +26,34 @@ except NotRegistered:
     pass
 
 
+# -------- Large tables --------
+class EstimatedCountPaginator(Paginator):
+    """
+    On Postgres, an unfiltered changelist of a big table takes the planner's
+    row estimate (pg_class.reltuples) instead of running COUNT(*).
+    Filtered lists and small tables still get the exact count.
+    """
+    exact_below = 10_000
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if connections[qs.db].vendor == "postgresql" and not qs.query.where:
+            with connections[qs.db].cursor() as cursor:
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                               [qs.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] >= self.exact_below:
+                return int(row[0])
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # skips the second, unfiltered COUNT(*)
+    list_per_page = 50
+
+
 # -------- Inlines --------
 class ProductImageInline(admin.TabularInline):
     model = ProductImage
@@ -30,6 +68,10 @@ class VariantInline(admin.TabularInline):
     fields = ("price_gross_cents", "stock", "attrs")
     ordering = ("id",)
 
+    def get_queryset(self, request):
+        # Variant.__str__ (shown above each row) reads product.title
+        return super().get_queryset(request).select_related("product")
+
 
 # -------- Product --------
 @admin.register(Product)
@@ -61,10 +103,130 @@ class QRInviteAdmin(admin.ModelAdmin):
         return format_html("<code>/invite/{}</code>", obj.token)
 
 
-# -------- Misc models --------
-admin.site.register(Heart)
-admin.site.register(Cart)
-admin.site.register(CartItem)
-admin.site.register(Order)
-admin.site.register(OrderItem)
-admin.site.register(Payment)
+# -------- Orders / payments --------
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    fields = ("sku", "product_title", "attrs", "quantity", "price_gross_cents", "price_net_cents", "vat_amount_cents")
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "status", "gross_total", "vat_total", "created_at", "needs_attention")
+    list_select_related = ("user",)
+    list_filter = ("status", "needs_attention")  # store_order_status_created_idx, store_order_attention_idx
+    date_hierarchy = "created_at"  # store_order_created_idx
+    search_fields = ("=user__username", "=postal_code")
+    raw_id_fields = ("user",)
+    ordering = ("-id",)
+    inlines = [OrderItemInline]
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(LargeTableAdmin):
+    list_display = ("id", "order_id", "sku", "product_title", "quantity", "price_gross_cents")
+    search_fields = ("=sku",)
+    raw_id_fields = ("order",)
+    ordering = ("-id",)
+
+
+@admin.register(Payment)
+class PaymentAdmin(LargeTableAdmin):
+    list_display = ("id", "order_id", "provider", "status", "amount_cents", "currency", "external_id")
+    list_filter = ("provider", "status")  # both have choices, so no SELECT DISTINCT; store_payment_prov_status_idx
+    search_fields = ("=external_id",)
+    raw_id_fields = ("order",)
+    ordering = ("-id",)
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(LargeTableAdmin):
+    list_display = ("id", "provider", "event_type", "event_id", "received_at", "processed_at", "attempts")
+    list_filter = ("provider",)
+    search_fields = ("=event_id",)
+    readonly_fields = ("provider", "event_id", "event_type", "payload", "received_at")
+    ordering = ("-id",)
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ("id", "kind", "run_after", "attempts", "max_attempts", "locked_until", "failed_at")
+    list_filter = ("kind",)
+    readonly_fields = ("kind", "payload", "created_at", "last_error")
+    ordering = ("run_after", "id")
+
+
+# -------- Sales report (reads SalesRollup only) --------
+@admin.register(SalesRollup)
+class SalesRollupAdmin(LargeTableAdmin):
+    list_display = ("day", "dimension", "label", "orders", "quantity", "gross_cents", "vat_cents")
+    list_filter = ("dimension",)
+    date_hierarchy = "day"
+    ordering = ("-day", "dimension", "key")
+    change_list_template = "admin/store/salesrollup/change_list.html"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path("report/", self.admin_site.admin_view(self.report_view), name="store_salesrollup_report"),
+        ] + super().get_urls()
+
+    def report_view(self, request):
+        today = timezone.localdate()
+        end = parse_date(request.GET.get("to") or "") or today
+        start = parse_date(request.GET.get("from") or "") or end - timedelta(days=29)
+        rows = SalesRollup.objects.filter(day__gte=start, day__lte=end)
+        sums = dict(orders=Sum("orders"), quantity=Sum("quantity"), gross=Sum("gross_cents"),
+                    net=Sum("net_cents"), vat=Sum("vat_cents"))
+
+        def by_key(dimension, limit=None):
+            qs = (rows.filter(dimension=dimension).values("key")
+                  .annotate(label=Max("label"), **sums).order_by("-gross"))
+            return qs[:limit] if limit else qs
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Sales report",
+            "start": start,
+            "end": end,
+            "totals": rows.filter(dimension=SalesRollup.DAY).aggregate(**sums),
+            "days": rows.filter(dimension=SalesRollup.DAY).order_by("-day"),
+            "vat_rates": by_key(SalesRollup.VAT_RATE),
+            "providers": by_key(SalesRollup.PROVIDER),
+            "products": by_key(SalesRollup.PRODUCT, limit=50),
+        }
+        return TemplateResponse(request, "admin/store/salesrollup/report.html", context)
+
+
+# -------- Carts / hearts --------
+@admin.register(Cart)
+class CartAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "created_at")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    ordering = ("-id",)
+
+
+@admin.register(CartItem)
+class CartItemAdmin(LargeTableAdmin):
+    list_display = ("id", "cart_id", "variant", "quantity")
+    list_select_related = ("variant__product",)
+    raw_id_fields = ("cart", "variant")
+    ordering = ("-id",)
+
+
+@admin.register(Heart)
+class HeartAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "product", "created_at")
+    list_select_related = ("user", "product")
+    raw_id_fields = ("user",)
+    autocomplete_fields = ("product",)
+    ordering = ("-id",)
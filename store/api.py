@@ -0,0 +1,125 @@
+# store/api.py
+"""
+Read-only JSON catalog API.
+
+  GET /api/products/?cursor=<id>&limit=50&fields=slug,title,min_price_cents&color=black
+  GET /api/products/<slug>/
+
+Rows are serialized straight from .values() (no model instances); the
+detail endpoint splices in the pre-serialized variant/image maps cached by
+store.catalog, so a warm hit is one slug lookup and no JSON re-encoding of
+the maps.
+"""
+import json
+
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+try:
+    import orjson  # optional, faster
+except ImportError:
+    orjson = None
+
+from .catalog import product_payload
+from .facets import filter_products, parse_facets
+from .http import catalog_api
+from .models import Product
+from .utils import keyset_page
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+# public field -> .values() source
+FIELDS = {
+    "id": "id",
+    "slug": "slug",
+    "title": "title",
+    "min_price_cents": "card__min_price_cents",
+    "max_price_cents": "card__max_price_cents",
+    "total_stock": "card__total_stock",
+    "image_url": "card__main_image_url",
+    "image_alt": "card__main_image_alt",
+    "hearts_count": "card__hearts_count",
+    "colors": "card__colors",
+    "sizes": "card__sizes",
+}
+COMPUTED = {
+    "in_stock": ("card__total_stock", lambda row: bool(row["card__total_stock"])),
+    "url": ("slug", lambda row: reverse("product_detail", args=[row["slug"]])),
+}
+DEFAULT_FIELDS = ["id", "slug", "title", "min_price_cents", "in_stock", "image_url", "url"]
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+def _json(body: bytes, status=200):
+    return HttpResponse(body, status=status, content_type="application/json")
+
+def _int_param(request, name, default):
+    try:
+        return int(request.GET.get(name) or default)
+    except ValueError:
+        return default
+
+def _requested_fields(request):
+    raw = request.GET.get("fields")
+    if not raw:
+        return DEFAULT_FIELDS
+    fields = [f for f in (x.strip() for x in raw.split(",")) if f in FIELDS or f in COMPUTED]
+    return fields or DEFAULT_FIELDS
+
+def _project(rows, fields):
+    out = []
+    for row in rows:
+        item = {}
+        for f in fields:
+            item[f] = COMPUTED[f][1](row) if f in COMPUTED else row[FIELDS[f]]
+        out.append(item)
+    return out
+
+
+@require_GET
+@catalog_api
+def product_list(request):
+    fields = _requested_fields(request)
+    sources = {"id"} | {FIELDS[f] for f in fields if f in FIELDS} | {COMPUTED[f][0] for f in fields if f in COMPUTED}
+    limit = max(1, min(_int_param(request, "limit", API_PAGE_SIZE), API_MAX_PAGE_SIZE))
+
+    qs = filter_products(Product.objects.all(), parse_facets(request.GET)).values(*sources)
+    rows, next_cursor = keyset_page(qs, before=_int_param(request, "cursor", 0) or None, size=limit)
+    return _json(dumps({"results": _project(rows, fields), "next_cursor": next_cursor}))
+
+@require_GET
+@catalog_api
+def product_detail(request, slug):
+    row = Product.objects.filter(slug=slug).values(
+        "id", "slug", "title", "description",
+        "card__min_price_cents", "card__max_price_cents", "card__total_stock",
+    ).first()
+    if row is None:
+        return JsonResponse({"error": "Not found."}, status=404)
+    product = Product(pk=row["id"], title=row["title"])  # enough for product_payload
+    payload = product_payload(product)
+    head = dumps({
+        "id": row["id"],
+        "slug": row["slug"],
+        "title": row["title"],
+        "description": row["description"],
+        "min_price_cents": row["card__min_price_cents"],
+        "max_price_cents": row["card__max_price_cents"],
+        "in_stock": bool(row["card__total_stock"]),
+        "colors": payload["colors"],
+        "hero": payload["hero"],
+    })
+    # splice the cached, already-serialized maps into the object
+    body = b"".join([
+        head[:-1],
+        b',"variant_map":', payload["variant_map_json"].encode(),
+        b',"images_map":', payload["images_map_json"].encode(),
+        b"}",
+    ])
+    return _json(body)
@@ -0,0 +1,152 @@
+# store/catalog.py
+import json
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Variant, ProductImage
+
+PRODUCT_PAYLOAD_TTL = 60 * 60 * 24
+PLACEHOLDER_IMAGE = {"url": "/static/img/placeholder.png", "alt": "No image available"}
+
+# same escapes as django's json_script, so cached strings can be dropped into <script> as-is
+_JSON_SCRIPT_ESCAPES = {ord(">"): "\\u003E", ord("<"): "\\u003C", ord("&"): "\\u0026"}
+
+
+def dumps_script_safe(data) -> str:
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":")).translate(_JSON_SCRIPT_ESCAPES)
+
+
+def normalize_color(c):
+    return (c or "One").strip().lower()
+
+
+# =========================================
+# GENERATION COUNTERS
+# =========================================
+
+def generation(key):
+    gen = cache.get(key)
+    if gen is None:
+        # seed from the clock so an evicted counter never reuses an old version
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        gen = cache.get(key)
+    return gen
+
+def bump_generation(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        return cache.get(key)
+
+def get_versioned(key, *gen_keys):
+    """
+    (value, generations) with the value and its generation counters read in
+    one cache round trip. value is None unless it was stored (set_versioned)
+    for exactly the current generations.
+    """
+    found = cache.get_many([key, *gen_keys])
+    gens = tuple(found[k] if k in found else generation(k) for k in gen_keys)
+    entry = found.get(key)
+    if entry is not None and entry[0] == gens:
+        return entry[1], gens
+    return None, gens
+
+def set_versioned(key, gens, value, timeout):
+    cache.set(key, (gens, value), timeout)
+
+def product_generation(product_id: int) -> int:
+    return generation(f"product:{product_id}:gen")
+
+def bump_product(product_id: int):
+    return bump_generation(f"product:{product_id}:gen")
+
+def catalog_version():
+    """(generation, last-modified datetime) of the whole public catalog."""
+    found = cache.get_many(["catalog:gen", "catalog:modified"])
+    gen = found["catalog:gen"] if "catalog:gen" in found else generation("catalog:gen")
+    modified = found.get("catalog:modified")
+    if modified is None:
+        modified = int(time.time())
+        cache.add("catalog:modified", modified, timeout=None)
+    return gen, datetime.fromtimestamp(modified, tz=dt_timezone.utc)
+
+def bump_catalog():
+    cache.set("catalog:modified", int(time.time()), timeout=None)
+    return bump_generation("catalog:gen")
+
+def product_changed(product_id: int):
+    bump_product(product_id)
+    bump_catalog()
+
+
+# =========================================
+# PRODUCT DETAIL PAYLOAD
+# =========================================
+
+def build_product_payload(product):
+    """Swatch colors, hero image and the variant/image maps the detail page JS reads."""
+    variants = (Variant.objects.filter(product_id=product.pk)
+                .order_by("price_gross_cents", "id")
+                .values("id", "price_gross_cents", "stock", "attrs"))
+    colors = []
+    vmap = {}
+    for v in variants:
+        attrs = v["attrs"] or {}
+        raw_color = attrs.get("color") or "One"
+        if raw_color not in colors:  # keep original name for swatches
+            colors.append(raw_color)
+        vmap.setdefault(normalize_color(raw_color), []).append({
+            "id": v["id"],
+            "size": attrs.get("size") or "",
+            "price": v["price_gross_cents"] or 0,
+            "stock": v["stock"],
+        })
+
+    imap = {}
+    generic = []
+    hero = None
+    images = (ProductImage.objects.filter(product_id=product.pk)
+              .order_by("sort_order", "id")
+              .values("url", "alt", "color"))
+    for img in images:
+        payload = {"url": img["url"], "alt": img["alt"] or product.title}
+        hero = hero or payload
+        if img["color"]:
+            imap.setdefault(normalize_color(img["color"]), []).append(payload)
+        else:
+            generic.append(payload)
+
+    # Fallbacks
+    for c in [normalize_color(c) for c in colors] or ["one"]:
+        if c not in imap:
+            imap[c] = generic if generic else [PLACEHOLDER_IMAGE]
+
+    return {
+        "colors": colors or ["One"],  # original names for buttons
+        "hero": hero,
+        "variant_map": vmap,          # normalized keys
+        "images_map": imap,           # normalized keys
+    }
+
+def product_payload(product):
+    """
+    Cached detail payload for the product's current generation. The maps are
+    stored pre-serialized (script-safe JSON) so a hit costs no ORM queries and
+    one cache read (payload and generation together).
+    """
+    key = f"product:{product.pk}:payload"
+    cached, gens = get_versioned(key, f"product:{product.pk}:gen")
+    if cached is None:
+        data = build_product_payload(product)
+        cached = {
+            "colors": data["colors"],
+            "hero": data["hero"],
+            "variant_map_json": dumps_script_safe(data["variant_map"]),
+            "images_map_json": dumps_script_safe(data["images_map"]),
+        }
+        set_versioned(key, gens, cached, PRODUCT_PAYLOAD_TTL)
+    return cached
@@ -0,0 +1,75 @@
+# store/checkout.py
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from .models import Cart, CartItem, Order, OrderItem
+from .pricing import bump_cart
+from .reservations import reserve
+from .utils import split_vat_from_gross, split_vat_many
+
+
+class EmptyCart(Exception):
+    pass
+
+
+def _sku(variant):
+    return f"{variant.product.slug}-{variant.pk}"[:64]
+
+def place_order(cart, user, address, coupon=None):
+    """
+    Snapshot the cart into an Order + OrderItems in one transaction.
+    Query count is independent of cart size: lock the cart row, load lines,
+    reserve stock (one conditional UPDATE + bulk insert of holds), insert
+    order, bulk insert items, take the ordered quantities off the cart lines.
+    Raises EmptyCart or reservations.OutOfStock.
+    """
+    if not cart:
+        raise EmptyCart()
+
+    vat_rate = float(getattr(settings, "GERMANY_STANDARD_VAT", 0.19))
+    with transaction.atomic():
+        # the lock serializes checkouts of this cart; units added concurrently
+        # (another tab, a bulk add) either make it into the order or stay in the cart
+        Cart.objects.select_for_update().filter(pk=cart.pk).first()
+        lines = list(CartItem.objects.filter(cart=cart).select_related("variant__product").order_by("id"))
+        if not lines:
+            raise EmptyCart()
+
+        unit_splits = split_vat_many([it.variant.price_gross_cents for it in lines], vat_rate)
+        subtotal = sum(s.gross * it.quantity for s, it in zip(unit_splits, lines))
+        discount = coupon.discount_amount(subtotal) if coupon else 0
+        totals = split_vat_from_gross(max(0, subtotal - discount), vat_rate)
+
+        order = Order.objects.create(
+            user=user,
+            vat_rate=vat_rate,
+            net_total=totals.net,
+            vat_total=totals.vat,
+            gross_total=totals.gross,
+            **address,
+        )
+        reserve({it.variant_id: it.quantity for it in lines}, order=order)
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                variant_id=it.variant_id,
+                product_title=it.variant.product.title,
+                sku=_sku(it.variant),
+                attrs=it.variant.attrs or {},
+                quantity=it.quantity,
+                price_gross_cents=split.gross,
+                price_net_cents=split.net,
+                vat_amount_cents=split.vat,
+            )
+            for it, split in zip(lines, unit_splits)
+        ])
+        # take off what was ordered: a line that grew meanwhile keeps the extra units
+        ordered = CartItem.objects.filter(pk__in=[it.pk for it in lines])
+        ordered.update(quantity=F("quantity") - Case(
+            *[When(pk=it.pk, then=Value(it.quantity)) for it in lines],
+            default=Value(0), output_field=PositiveIntegerField(),
+        ))
+        ordered.filter(quantity=0).delete()
+    transaction.on_commit(lambda: bump_cart(cart.pk))
+    return order
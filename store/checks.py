@@ -0,0 +1,21 @@
+# store/checks.py
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PER_PROCESS_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches, deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    """Catalog generations and payload caches are only coherent in a cache every process shares."""
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend in PER_PROCESS_CACHES:
+        return [Error(
+            f"CACHES['default'] uses {backend}, which is not shared between processes.",
+            hint="Set REDIS_URL, or use the DatabaseCache default from settings.",
+            id="store.E001",
+        )]
+    return []
@@ -0,0 +1,16 @@
+# store/context_processors.py
+from django.utils.functional import SimpleLazyObject
+
+from .models import Cart
+from .pricing import cart_count
+
+
+def mini_cart(request):
+    """Lazy {{ mini_cart.count }} for the nav badge; served from the cached cart count."""
+    def count():
+        if request.user.is_authenticated:
+            cart_id = Cart.objects.filter(user=request.user).values_list("pk", flat=True).first()
+        else:
+            cart_id = request.session.get("cart_id")
+        return cart_count(cart_id)
+    return {"mini_cart": {"count": SimpleLazyObject(count)}}
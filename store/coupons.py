@@ -0,0 +1,39 @@
+# store/coupons.py
+"""
+Per-worker coupon table: codes are looked up once through the lower(code)
+index, then served from memory for COUPON_TTL seconds. Saves and deletes
+clear the table in this worker (store.signals); other workers catch up
+within the TTL. Unknown codes are cached too, so retries of a typo are free.
+"""
+import time
+
+from django.db.models.functions import Lower
+
+from .models import Coupon
+
+COUPON_TTL = 60
+MAX_ENTRIES = 1024
+
+_table = {}  # normalized code -> (expires_at monotonic, Coupon or None)
+
+
+def normalize_code(code) -> str:
+    return (code or "").strip().lower()
+
+def lookup(code):
+    """The currently valid coupon for a code (case-insensitive), else None."""
+    key = normalize_code(code)
+    if not key:
+        return None
+    now = time.monotonic()
+    hit = _table.get(key)
+    if hit is None or hit[0] <= now:
+        coupon = Coupon.objects.alias(code_lower=Lower("code")).filter(code_lower=key).first()
+        if len(_table) >= MAX_ENTRIES:
+            _table.clear()
+        hit = _table[key] = (now + COUPON_TTL, coupon)
+    coupon = hit[1]
+    return coupon if coupon is not None and coupon.is_valid() else None
+
+def invalidate():
+    _table.clear()
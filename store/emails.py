@@ -2,6 +2,8 @@ from django.core import signing, mail
 from django.conf import settings
 from django.urls import reverse
 
+from . import jobs
+
 def make_activation_token(user_id: int) -> str:
     return signing.dumps({"uid": user_id}, salt="email-verify")
 
@@ -12,8 +14,30 @@ def parse_activation_token(token: str) -> int | None:
     except Exception:
         return None
 
+def queue_mail(subject: str, body: str, to, from_email=None):
+    """Send later, from `manage.py run_jobs` (store.jobs), not inside the request."""
+    return jobs.enqueue("send_mail", {
+        "subject": subject, "body": body, "to": list(to),
+        "from_email": from_email or settings.DEFAULT_FROM_EMAIL,
+    })
+
+def deliver_batch(batch):
+    """Job handler: send a batch of queued mails over one connection. Returns {job_id: error}."""
+    failures = {}
+    with mail.get_connection() as connection:
+        for job in batch:
+            p = job.payload
+            try:
+                message = mail.EmailMessage(p["subject"], p["body"], p.get("from_email"), p["to"],
+                                            connection=connection)
+                # one message per call so a bad address only fails (and retries) its own job
+                connection.send_messages([message])
+            except Exception as exc:
+                failures[job.pk] = repr(exc)
+    return failures
+
 def send_activation_email(request, user):
     token = make_activation_token(user.id)
     url = request.build_absolute_uri(reverse("verify_email", args=[token]))
     body = f"Welcome to the private shop!\nVerify your email:\n{url}"
-    mail.send_mail("Verify your email", body, settings.DEFAULT_FROM_EMAIL, [user.email])
+    queue_mail("Verify your email", body, [user.email])
@@ -0,0 +1,85 @@
+# store/exports.py
+"""
+Order / VAT export for accounting, one row per order line.
+
+Orders are read with .iterator(chunk_size) (a server-side cursor on
+Postgres), payment and buyer come in through select_related and the lines
+through one prefetch query per chunk, so memory stays constant and the
+query count grows with chunks, not orders. Rows are yielded as encoded
+text so the same generator feeds `manage.py export_orders` and the
+StreamingHttpResponse in store.views.
+"""
+import csv
+import json
+from datetime import datetime, time as dtime
+
+from django.utils import timezone
+
+from .models import Order
+
+COLUMNS = [
+    "order_id", "created_at", "status", "customer", "email", "country", "vat_rate",
+    "order_net_cents", "order_vat_cents", "order_gross_cents", "shipping_fee_cents",
+    "payment_provider", "payment_status", "payment_external_id", "payment_amount_cents", "currency",
+    "line_sku", "line_title", "line_quantity",
+    "line_price_gross_cents", "line_price_net_cents", "line_vat_cents",
+]
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+def parse_day(value, end=False):
+    """'2026-03-01' -> aware datetime at the start (or end) of that day."""
+    day = datetime.strptime(value, "%Y-%m-%d").date()
+    return timezone.make_aware(datetime.combine(day, dtime.max if end else dtime.min))
+
+def orders_between(start=None, end=None, status=None):
+    qs = Order.objects.select_related("payment", "user").prefetch_related("items").order_by("id")
+    if start:
+        qs = qs.filter(created_at__gte=start)
+    if end:
+        qs = qs.filter(created_at__lte=end)
+    if status:
+        qs = qs.filter(status=status)
+    return qs
+
+def order_rows(orders, chunk_size=2000):
+    for order in orders.iterator(chunk_size=chunk_size):
+        try:
+            payment = order.payment
+        except Order.payment.RelatedObjectDoesNotExist:
+            payment = None
+        head = [
+            order.pk, order.created_at.isoformat(), order.status, order.full_name,
+            order.user.email, order.country, order.vat_rate,
+            order.net_total, order.vat_total, order.gross_total, order.shipping_fee_cents,
+            payment.provider if payment else "", payment.status if payment else "",
+            payment.external_id if payment else "", payment.amount_cents if payment else "",
+            payment.currency if payment else "",
+        ]
+        items = order.items.all()
+        if not items:
+            yield head + ["", "", "", "", "", ""]
+        for item in items:
+            yield head + [
+                item.sku, item.product_title, item.quantity,
+                item.price_gross_cents, item.price_net_cents, item.vat_amount_cents,
+            ]
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+def stream_jsonl(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n"
+
+def stream(fmt, orders, chunk_size=2000):
+    rows = order_rows(orders, chunk_size=chunk_size)
+    return stream_jsonl(rows) if fmt == "jsonl" else stream_csv(rows)
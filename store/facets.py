@@ -0,0 +1,57 @@
+# store/facets.py
+"""
+Catalog filtering by variant options (?color=black&size=eu+43).
+Values of one facet are OR'ed, facets are AND'ed, and all selected facets
+must match the same variant. Counts come from the VariantOption index,
+one grouped query per facet.
+"""
+from django.db.models import Count, Exists, Min, OuterRef
+
+from .models import FACET_ATTRS, Variant, VariantOption, normalize_option
+
+
+def parse_facets(params):
+    """{facet: [normalized values]} from a QueryDict, facets in FACET_ATTRS only."""
+    selected = {}
+    for name in FACET_ATTRS:
+        values = [normalize_option(v) for v in params.getlist(name) if v.strip()]
+        if values:
+            selected[name] = sorted(set(values))
+    return selected
+
+def filter_products(qs, selected):
+    if not selected:
+        return qs
+    variants = Variant.objects.filter(product=OuterRef("pk"))
+    for name, values in selected.items():
+        variants = variants.filter(Exists(
+            VariantOption.objects.filter(variant=OuterRef("pk"), name=name, value__in=values)
+        ))
+    return qs.filter(Exists(variants))
+
+def facet_counts(base_qs, selected, params):
+    """
+    {facet: [{"value", "label", "count", "selected", "query"}]}. Each facet is
+    counted against the other facets' selection (one query per facet), so
+    picking "black" still shows how many products come in "white".
+    "query" is the query string that toggles the value.
+    """
+    facets = {}
+    for name in FACET_ATTRS:
+        others = {k: v for k, v in selected.items() if k != name}
+        products = filter_products(base_qs, others).order_by().values("pk")
+        rows = (VariantOption.objects
+                .filter(name=name, product__in=products)
+                .values("value")
+                .annotate(label=Min("label"), count=Count("product", distinct=True))
+                .order_by("value"))
+        chosen = set(selected.get(name, ()))
+        facets[name] = []
+        for row in rows:
+            query = params.copy()
+            query.pop("before", None)  # a new filter starts from the first page
+            query.setlist(name, sorted(chosen ^ {row["value"]}))
+            facets[name].append({
+                **row, "selected": row["value"] in chosen, "query": query.urlencode(),
+            })
+    return facets
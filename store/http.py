@@ -0,0 +1,93 @@
+# store/http.py
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .catalog import catalog_version
+
+
+def is_anonymous_safe(request):
+    """True if the page renders the same for every visitor (no user, no flash messages)."""
+    if request.user.is_authenticated:
+        return False
+    return len(get_messages(request)) == 0
+
+def is_shareable(request, response):
+    """
+    True if the response carries nothing per-visitor: no cookies, no CSRF token
+    rendered into it (get_token() flags the request) and no session write
+    (that cookie is only added by the middleware, after the view).
+    """
+    if response.cookies or request.META.get("CSRF_COOKIE_NEEDS_UPDATE"):
+        return False
+    session = getattr(request, "session", None)
+    return not (session is not None and session.modified)
+
+def _request_catalog_version(request):
+    """catalog_version(), read once per request (the ETag and Last-Modified both need it)."""
+    if not hasattr(request, "_catalog_version"):
+        request._catalog_version = catalog_version()
+    return request._catalog_version
+
+def _catalog_etag(request, *args, **kwargs):
+    if not is_anonymous_safe(request):
+        return None
+    gen, _ = _request_catalog_version(request)
+    return f"catalog-{gen}-{settings.RELEASE}"
+
+def _catalog_last_modified(request, *args, **kwargs):
+    if not is_anonymous_safe(request):
+        return None
+    return _request_catalog_version(request)[1]
+
+def catalog_page(view):
+    """
+    Conditional GET for catalog views: ETag / Last-Modified from the catalog
+    generation (304 before the view runs), public CDN caching for anonymous
+    visitors and private, revalidated caching for everyone else. A response
+    that turns out to be per-visitor anyway (see is_shareable) stays private.
+    """
+    conditional = condition(etag_func=_catalog_etag, last_modified_func=_catalog_last_modified)(view)
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        response = conditional(request, *args, **kwargs)
+        if response.status_code not in (200, 304):
+            return response
+        if is_anonymous_safe(request) and is_shareable(request, response):
+            patch_cache_control(
+                response, public=True, max_age=0,
+                s_maxage=settings.CATALOG_CDN_MAX_AGE,
+                stale_while_revalidate=settings.CATALOG_CDN_STALE,
+            )
+        else:
+            patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+        patch_vary_headers(response, ("Cookie",))
+        return response
+    return wrapped
+
+
+def _api_etag(request, *args, **kwargs):
+    gen, _ = _request_catalog_version(request)
+    return f"api-{gen}-{settings.RELEASE}"
+
+def catalog_api(view):
+    """Like catalog_page, but API responses never depend on the visitor: always public."""
+    conditional = condition(
+        etag_func=_api_etag, last_modified_func=lambda request, *a, **kw: _request_catalog_version(request)[1],
+    )(view)
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        response = conditional(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            patch_cache_control(
+                response, public=True, max_age=0,
+                s_maxage=settings.CATALOG_CDN_MAX_AGE,
+                stale_while_revalidate=settings.CATALOG_CDN_STALE,
+            )
+        return response
+    return wrapped
@@ -0,0 +1,244 @@
+# store/importer.py
+"""
+Streaming catalog import from CSV or JSONL.
+
+Every input row has a "kind" of product, variant or image and a "slug"
+naming its product:
+
+    kind,slug,title,description,status,price_gross_cents,stock,attrs,url,alt,sort_order,color
+    product,air-jordan-4,Air Jordan 4,,active,,,,,,,
+    variant,air-jordan-4,,,,14999,3,"{""color"":""Black"",""size"":""EU 43""}",,,,
+    image,air-jordan-4,,,,,,,https://.../aj4.jpg,AJ4 black,0,Black
+
+JSONL lines may be flat rows like the CSV, or one nested product per line
+with "variants" and "images" lists. A product row must come before (or in
+the same chunk as) its variants and images, unless the product already exists.
+
+Rows are applied in fixed-size chunks, one transaction per chunk, so memory
+stays flat however large the file is:
+  * products upsert by slug (bulk_create with update_conflicts), updating
+    only the columns the row actually has; new products default to draft;
+  * variants match existing ones by their attrs and are updated in place,
+    otherwise created; variants missing from the file are left alone.
+    A variant row must have a price; without a stock column the stock of an
+    existing variant is left untouched;
+  * images of a product mentioned in the file replace its existing images.
+bulk_* skips the model signals (and the per-row image delete signals are
+muted), so each chunk refreshes the product cards,
+facet options and search documents itself and bumps the catalog generations.
+"""
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .catalog import bump_catalog, bump_product
+from .models import Product, ProductCard, ProductImage, Variant, VariantOption
+from .search import index_products
+from .signals import catalog_signals_muted
+
+PRODUCT_FIELDS = ("title", "description", "status")
+STATUSES = {value for value, _ in Product.STATUS_CHOICES}
+
+
+class CatalogImportError(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    products: int = 0
+    variants_created: int = 0
+    variants_updated: int = 0
+    images: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+# =========================================
+# READERS
+# =========================================
+
+def read_csv(fh):
+    for row in csv.DictReader(fh):
+        yield {k: v for k, v in row.items() if v not in (None, "")}
+
+def read_jsonl(fh):
+    for line in fh:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if "kind" in record:
+            yield record
+            continue
+        variants = record.pop("variants", [])
+        images = record.pop("images", [])
+        slug = record["slug"]
+        yield {**record, "kind": "product"}
+        for v in variants:
+            yield {**v, "kind": "variant", "slug": slug}
+        for img in images:
+            yield {**img, "kind": "image", "slug": slug}
+
+def read_rows(fh, fmt):
+    return read_jsonl(fh) if fmt == "jsonl" else read_csv(fh)
+
+
+# =========================================
+# CHUNK APPLY
+# =========================================
+
+def _int(row, name, n, minimum=0):
+    try:
+        value = int(row[name])
+    except (TypeError, ValueError):
+        raise CatalogImportError(f"row {n}: {name} must be a whole number, got {row[name]!r}")
+    if value < minimum:
+        raise CatalogImportError(f"row {n}: {name} must be >= {minimum}")
+    return value
+
+def clean_row(row, n):
+    """Validate one input row (n is its 1-based position) and coerce its values."""
+    kind, slug = row.get("kind"), row.get("slug")
+    if kind not in ("product", "variant", "image") or not slug:
+        raise CatalogImportError(f"row {n}: needs kind (product/variant/image) and slug")
+    row = dict(row)
+    if kind == "product":
+        if "status" in row and row["status"] not in STATUSES:
+            raise CatalogImportError(f"row {n}: status must be one of {', '.join(sorted(STATUSES))}")
+    elif kind == "variant":
+        if row.get("price_gross_cents") in (None, ""):
+            raise CatalogImportError(f"row {n}: variant rows need price_gross_cents")
+        row["price_gross_cents"] = _int(row, "price_gross_cents", n)
+        if row.get("stock") not in (None, ""):
+            row["stock"] = _int(row, "stock", n)
+        else:
+            row.pop("stock", None)
+        attrs = row.get("attrs") or {}
+        if isinstance(attrs, str):
+            try:
+                attrs = json.loads(attrs)
+            except ValueError:
+                raise CatalogImportError(f"row {n}: attrs is not valid JSON")
+        if not isinstance(attrs, dict):
+            raise CatalogImportError(f"row {n}: attrs must be a JSON object")
+        row["attrs"] = attrs
+    else:
+        if not row.get("url"):
+            raise CatalogImportError(f"row {n}: image rows need a url")
+        row["sort_order"] = _int(row, "sort_order", n) if row.get("sort_order") not in (None, "") else 0
+    return row
+
+def _attrs_key(attrs):
+    return json.dumps(attrs or {}, sort_keys=True)
+
+def _apply_chunk(rows, result, replaced_images):
+    now = timezone.now()
+    products = {}
+    for row in rows:
+        if row["kind"] == "product":
+            products[row["slug"]] = row
+    # rows that omit a column must not reset it, so upsert per set of columns present
+    by_fields = {}
+    for slug, row in products.items():
+        fields = tuple(f for f in PRODUCT_FIELDS if f in row)
+        by_fields.setdefault(fields, []).append(Product(
+            slug=slug,
+            title=row.get("title", slug),
+            description=row.get("description", ""),
+            status=row.get("status", Product.DRAFT),
+            published_at=now if row.get("status") == Product.ACTIVE else None,
+        ))
+    for fields, objs in by_fields.items():
+        if fields:
+            Product.objects.bulk_create(objs, update_conflicts=True, unique_fields=["slug"], update_fields=list(fields))
+        else:
+            Product.objects.bulk_create(objs, ignore_conflicts=True)
+    result.products += len(products)
+
+    slugs = {row["slug"] for row in rows}
+    ids = dict(Product.objects.filter(slug__in=slugs).values_list("slug", "id"))
+    missing = slugs - ids.keys()
+    if missing:
+        result.errors.append(f"unknown product slug(s): {', '.join(sorted(missing))}")
+    if products:
+        Product.objects.filter(
+            id__in=[ids[s] for s in products if s in ids],
+            status=Product.ACTIVE, published_at__isnull=True,
+        ).update(published_at=now)
+
+    # variants: match on (product, attrs)
+    variant_rows = [r for r in rows if r["kind"] == "variant" and r["slug"] in ids]
+    existing = {}
+    for v in Variant.objects.filter(product_id__in={ids[r["slug"]] for r in variant_rows}):
+        existing.setdefault((v.product_id, _attrs_key(v.attrs)), v)
+    to_create, price_only, price_and_stock = [], {}, {}
+    for r in variant_rows:
+        pid, attrs = ids[r["slug"]], r["attrs"]
+        v = existing.get((pid, _attrs_key(attrs)))
+        if v is None:
+            v = Variant(product_id=pid, attrs=attrs, stock=0)
+            existing[(pid, _attrs_key(attrs))] = v
+            to_create.append(v)
+        elif v.pk:
+            # don't write back a stock we only read: checkouts may be taking units meanwhile
+            (price_and_stock if "stock" in r else price_only)[v.pk] = v
+        v.price_gross_cents = r["price_gross_cents"]
+        if "stock" in r:
+            v.stock = r["stock"]
+    Variant.objects.bulk_create(to_create)
+    Variant.objects.bulk_update(price_and_stock.values(), ["price_gross_cents", "stock"])
+    Variant.objects.bulk_update(price_only.values(), ["price_gross_cents"])
+    result.variants_created += len(to_create)
+    result.variants_updated += len(price_only.keys() | price_and_stock.keys())
+
+    # images: the file is authoritative for every product it lists images for
+    image_rows = [r for r in rows if r["kind"] == "image" and r["slug"] in ids]
+    fresh = {ids[r["slug"]] for r in image_rows} - replaced_images
+    ProductImage.objects.filter(product_id__in=fresh).delete()
+    replaced_images |= fresh
+    ProductImage.objects.bulk_create([
+        ProductImage(
+            product_id=ids[r["slug"]], url=r["url"], alt=r.get("alt", ""),
+            sort_order=r["sort_order"], color=r.get("color", ""),
+        )
+        for r in image_rows
+    ])
+    result.images += len(image_rows)
+
+    touched = list(set(ids.values()))
+    ProductCard.objects.refresh(touched)
+    VariantOption.objects.sync(
+        Variant.objects.filter(product_id__in=touched).only("id", "product_id", "attrs")
+    )
+    index_products(touched)
+    return touched
+
+def import_catalog(rows, chunk_size=1000):
+    """Apply an iterable of import rows; returns an ImportResult."""
+    result = ImportResult()
+    replaced_images = set()
+    started = time.perf_counter()
+    rows = iter(rows)
+    while True:
+        chunk = [clean_row(row, result.rows + i) for i, row in enumerate(islice(rows, chunk_size), 1)]
+        if not chunk:
+            break
+        result.rows += len(chunk)
+        with transaction.atomic(), catalog_signals_muted():
+            touched = _apply_chunk(chunk, result, replaced_images)
+            transaction.on_commit(lambda touched=touched: [bump_product(pid) for pid in touched])
+    if result.rows:
+        bump_catalog()
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,101 @@
+# store/jobs.py
+"""
+Small durable job queue on the Job table, for work that shouldn't run
+inside a request (mail, slow side effects).
+
+    from store import jobs
+    jobs.enqueue("send_mail", {"subject": ..., "body": ..., "to": [...]})
+
+`manage.py run_jobs` claims due jobs in batches and hands each kind's jobs
+to its handler in one call, so handlers can share a connection (the mail
+handler sends a whole batch over one SMTP connection).
+
+Claiming: on Postgres the due rows are picked with FOR UPDATE SKIP LOCKED,
+so several workers never wait on each other. SQLite has no row locks; the
+claiming UPDATE re-checks the lease and takes the database write lock, so
+concurrent workers still can't claim the same job (they just serialize).
+A claim is a lease: if a worker dies, its jobs become due again once
+locked_until passes.
+"""
+import secrets
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+from .utils import retry_backoff, skip_locked
+
+# kind -> dotted path of handler(batch) -> {job_id: error} for the jobs that failed
+HANDLERS = {
+    "send_mail": "store.emails.deliver_batch",
+}
+LEASE = timedelta(minutes=5)
+
+
+def enqueue(kind, payload, *, run_after=None, max_attempts=5):
+    if kind not in HANDLERS:
+        raise ValueError(f"unknown job kind {kind!r}")
+    return Job.objects.create(kind=kind, payload=payload, max_attempts=max_attempts,
+                              run_after=run_after or timezone.now())
+
+def enqueue_many(kind, payloads, *, max_attempts=5):
+    if kind not in HANDLERS:
+        raise ValueError(f"unknown job kind {kind!r}")
+    now = timezone.now()
+    return Job.objects.bulk_create(
+        [Job(kind=kind, payload=p, max_attempts=max_attempts, run_after=now) for p in payloads],
+        batch_size=1000,
+    )
+
+
+def claim(batch_size=100, lease=LEASE):
+    """Lease up to batch_size due jobs to this worker and return them."""
+    now = timezone.now()
+    free = Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    due = Job.objects.filter(free, failed_at__isnull=True, run_after__lte=now).order_by("run_after", "id")
+    token = secrets.token_hex(16)
+    with transaction.atomic():
+        ids = list(skip_locked(due).values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return []
+        Job.objects.filter(free, pk__in=ids).update(
+            locked_by=token, locked_until=now + lease, attempts=F("attempts") + 1,
+        )
+    return list(Job.objects.filter(locked_by=token).order_by("id"))
+
+def _finish(jobs, failures):
+    now = timezone.now()
+    done = [j.pk for j in jobs if j.pk not in failures]
+    Job.objects.filter(pk__in=done).delete()
+    retry = []
+    for job in jobs:
+        if job.pk not in failures:
+            continue
+        job.last_error = str(failures[job.pk])[:2000]
+        job.locked_by, job.locked_until = "", None
+        if job.attempts >= job.max_attempts:
+            job.failed_at = now
+        else:
+            job.run_after = now + retry_backoff(job.attempts)
+        retry.append(job)
+    Job.objects.bulk_update(retry, ["last_error", "locked_by", "locked_until", "failed_at", "run_after"])
+    return len(done)
+
+def run_pending(batch_size=100):
+    """Claim and run one batch. Returns (done, failed)."""
+    jobs = claim(batch_size)
+    by_kind = {}
+    for job in jobs:
+        by_kind.setdefault(job.kind, []).append(job)
+    done = failed = 0
+    for kind, group in by_kind.items():
+        try:
+            failures = import_string(HANDLERS[kind])(group) or {}
+        except Exception as exc:  # handler blew up as a whole
+            failures = {job.pk: repr(exc) for job in group}
+        done += _finish(group, failures)
+        failed += len(failures)
+    return done, failed
@@ -0,0 +1,74 @@
+# store/maintenance.py
+"""
+Housekeeping that keeps the store tables from growing without bound.
+Everything deletes in primary-key chunks, one short transaction per chunk,
+so no statement holds locks for long. Call purge_all() from cron or a
+worker loop; `manage.py purge_stale` is the CLI entry point.
+"""
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .models import Cart, CartItem, QRInvite
+
+
+@dataclass
+class PurgeResult:
+    name: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def purge_in_chunks(name, qs, chunk_size=1000, pause=0.0):
+    """Delete qs chunk by chunk: pick ids, then DELETE .. WHERE <qs> AND pk IN (ids)."""
+    label = qs.model._meta.label
+    rows = 0
+    started = time.perf_counter()
+    while True:
+        with transaction.atomic():
+            ids = list(qs.order_by("pk").values_list("pk", flat=True)[:chunk_size])
+            if ids:
+                # qs's own filter is re-checked: a cart that got items since the SELECT stays
+                rows += qs.filter(pk__in=ids).delete()[1].get(label, 0)
+        if len(ids) < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return PurgeResult(name, rows, time.perf_counter() - started)
+
+
+def abandoned_carts(cart_days):
+    """Anonymous carts, and empty user carts, older than the retention window."""
+    cutoff = timezone.now() - timedelta(days=cart_days)
+    has_items = Exists(CartItem.objects.filter(cart=OuterRef("pk")))
+    return Cart.objects.filter(created_at__lt=cutoff).filter(Q(user__isnull=True) | ~Q(has_items))
+
+def stale_invites(invite_days):
+    """Invites expired, or used up, longer ago than the retention window."""
+    cutoff = timezone.now() - timedelta(days=invite_days)
+    return QRInvite.objects.filter(
+        Q(expires_at__lt=cutoff) | Q(uses__gte=F("max_uses"), used_at__lt=cutoff)
+    )
+
+def expired_sessions():
+    return Session.objects.filter(expire_date__lt=timezone.now())
+
+
+def purge_all(cart_days=None, invite_days=None, chunk_size=1000, pause=0.0):
+    cart_days = cart_days if cart_days is not None else settings.CART_RETENTION_DAYS
+    invite_days = invite_days if invite_days is not None else settings.INVITE_RETENTION_DAYS
+    return [
+        purge_in_chunks("carts", abandoned_carts(cart_days), chunk_size, pause),
+        purge_in_chunks("invites", stale_invites(invite_days), chunk_size, pause),
+        purge_in_chunks("sessions", expired_sessions(), chunk_size, pause),
+    ]
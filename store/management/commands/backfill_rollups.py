@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.functions import Coalesce, TruncDate
+
+from store.exports import parse_day
+from store.models import Order, SalesRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the sales rollups from paid orders (optionally only for a day range)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start", help="First day, YYYY-MM-DD (inclusive).")
+        parser.add_argument("--to", dest="end", help="Last day, YYYY-MM-DD (inclusive).")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        try:
+            start = parse_day(opts["start"]).date() if opts["start"] else None
+            end = parse_day(opts["end"]).date() if opts["end"] else None
+        except ValueError:
+            raise CommandError("Dates must be YYYY-MM-DD.")
+        orders = Order.objects.filter(status=Order.PAID).annotate(
+            paid_day=TruncDate(Coalesce("paid_at", "created_at"))
+        ).order_by("id")
+        rollups = SalesRollup.objects.all()
+        if start:
+            orders, rollups = orders.filter(paid_day__gte=start), rollups.filter(day__gte=start)
+        if end:
+            orders, rollups = orders.filter(paid_day__lte=end), rollups.filter(day__lte=end)
+        with transaction.atomic():
+            deleted, _ = rollups.delete()
+            count = SalesRollup.objects.backfill(orders, chunk_size=opts["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Replaced {deleted} rollup rows from {count} paid orders ({SalesRollup.objects.count()} rows now)."
+        ))
@@ -0,0 +1,74 @@
+import math
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from store.models import Product, Variant
+from store.search import backend, index_products, search_products
+
+WORDS = (
+    "air jordan max dunk low high retro runner court classic trail neon black white red blue "
+    "green grey suede leather canvas mesh knit boost foam zoom pro lite og vintage street"
+).split()
+COLORS = ("Black", "White", "Red", "Blue", "Green", "Grey")
+QUERIES = ("jordan", "air max", "neon run", "black suede", "court classic low", "zoom", "retro og", "trail")
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Index N scratch products and time search_products() on the active backend (all changes rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=20, help="runs per query")
+        parser.add_argument("--target-ms", type=float, default=10.0)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(0)
+        run = uuid.uuid4().hex[:8]
+        timings = []
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                ids = []
+                for start in range(0, opts["products"], 5000):
+                    products = Product.objects.bulk_create([
+                        Product(title=" ".join(rng.sample(WORDS, 3)).title(), slug=f"bench-{run}-{n}",
+                                description=" ".join(rng.sample(WORDS, 8)), status=Product.ACTIVE)
+                        for n in range(start, min(start + 5000, opts["products"]))
+                    ])
+                    chunk = [p.pk for p in products]
+                    Variant.objects.bulk_create([
+                        Variant(product_id=pid, price_gross_cents=9999, stock=1,
+                                attrs={"color": rng.choice(COLORS), "size": f"EU {rng.randint(38, 46)}"})
+                        for pid in chunk
+                    ])
+                    index_products(chunk)
+                    ids += chunk
+                self.stdout.write(f"indexed {len(ids)} products with {type(backend()).__name__} "
+                                  f"on {connection.vendor} in {time.perf_counter() - started:.1f}s")
+
+                for query in QUERIES:
+                    search_products(query)  # warm up
+                    for _ in range(opts["repeat"]):
+                        t = time.perf_counter()
+                        search_products(query)
+                        timings.append((time.perf_counter() - t) * 1000)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        timings.sort()
+        p50, p95 = statistics.median(timings), timings[math.ceil(len(timings) * 0.95) - 1]
+        self.stdout.write(f"{len(timings)} searches: p50 {p50:.2f}ms  p95 {p95:.2f}ms  max {timings[-1]:.2f}ms")
+        if p95 > opts["target_ms"]:
+            self.stderr.write(self.style.ERROR(f"p95 is over the {opts['target_ms']:g}ms target."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"p95 is within the {opts['target_ms']:g}ms target."))
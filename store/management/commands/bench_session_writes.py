@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from store.models import Variant
+
+# the baseline set neither, so it ran on Django's defaults
+STRATEGIES = {
+    "before (db sessions, default messages)": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+        "MESSAGE_STORAGE": "django.contrib.messages.storage.fallback.FallbackStorage",
+    },
+    "cached_db + cookie messages": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.cached_db",
+        "MESSAGE_STORAGE": "django.contrib.messages.storage.cookie.CookieStorage",
+    },
+    "cache + cookie messages": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.cache",
+        "MESSAGE_STORAGE": "django.contrib.messages.storage.cookie.CookieStorage",
+    },
+    "signed_cookies + cookie messages": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.signed_cookies",
+        "MESSAGE_STORAGE": "django.contrib.messages.storage.cookie.CookieStorage",
+    },
+}
+
+# who is shopping: a logged-in user (DB cart by user), an anonymous visitor
+# (DB cart referenced by session["cart_id"]) and an anonymous visitor on the
+# session-only fallback cart (utils.encode_cart / decode_cart in session["cart"])
+VISITORS = ("logged in", "anonymous", "anonymous, session cart")
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Count every query of a scripted cart session under each session strategy, split into "
+            "django_session, cache table and other tables (all changes rolled back).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=50, help="add-to-cart + cart view rounds per strategy")
+
+    def handle(self, *args, **opts):
+        variant_id = Variant.objects.values_list("pk", flat=True).first()
+        if variant_id is None:
+            raise CommandError("Need at least one Variant.")
+        cache = settings.CACHES["default"]
+        self.stdout.write(f"cache: {cache['BACKEND'].rsplit('.', 1)[-1]}")
+        if cache["BACKEND"].endswith("DatabaseCache"):
+            # cached_db/cache sessions only save queries when the cache is not another table
+            self.stdout.write(self.style.WARNING("Without REDIS_URL the session cache is a table in the same database."))
+        for name, overrides in STRATEGIES.items():
+            for visitor in VISITORS:
+                counts = self._run(overrides, visitor, variant_id, opts["rounds"])
+                self.stdout.write(
+                    f"{name:40} {visitor:24} {counts['total']:5} queries  "
+                    f"session {counts['session_reads']:4} reads {counts['session_writes']:4} writes  "
+                    f"cache table {counts['cache']:4}  other {counts['other']:4}"
+                )
+
+    def _run(self, overrides, visitor, variant_id, rounds):
+        cache_table = settings.CACHES["default"].get("LOCATION", "") \
+            if settings.CACHES["default"]["BACKEND"].endswith("DatabaseCache") else None
+        counts = dict.fromkeys(("total", "session_reads", "session_writes", "cache", "other"), 0)
+        session_cart = mock.patch("store.views._has_db_cart", return_value=visitor != VISITORS[2])
+        try:
+            with override_settings(ALLOWED_HOSTS=["*"], **overrides), session_cart, transaction.atomic():
+                client = Client()
+                if visitor == VISITORS[0]:
+                    client.force_login(User.objects.create_user(username="__bench_sessions__", password="x"))
+                with CaptureQueriesContext(connection) as ctx:
+                    for _ in range(rounds):
+                        client.post(f"/cart/add/{variant_id}/")
+                        client.get("/cart/")
+                for q in ctx.captured_queries:
+                    sql = q["sql"]
+                    if sql.startswith(("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")):
+                        continue
+                    counts["total"] += 1
+                    if "django_session" in sql:
+                        counts["session_reads" if sql.startswith("SELECT") else "session_writes"] += 1
+                    elif cache_table and cache_table in sql:
+                        counts["cache"] += 1
+                    else:
+                        counts["other"] += 1
+                raise _Rollback
+        except _Rollback:
+            pass
+        return counts
@@ -0,0 +1,53 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from store.models import Product, StockHold, Variant
+from store.reservations import OutOfStock, reserve
+
+
+class Command(BaseCommand):
+    help = "Race N buyers for one variant through store.reservations and report throughput (creates and removes a scratch product)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--buyers", type=int, default=300)
+        parser.add_argument("--stock", type=int, default=100)
+        parser.add_argument("--workers", type=int, default=16)
+
+    def handle(self, *args, **opts):
+        product = Product.objects.create(title="Contention bench", slug=f"bench-{uuid.uuid4().hex[:12]}")
+        variant = Variant.objects.create(product=product, price_gross_cents=1000, stock=opts["stock"])
+
+        def buy(_):
+            try:
+                reserve({variant.pk: 1})
+                return "ok"
+            except OutOfStock:
+                return "sold_out"
+            except OperationalError:  # e.g. SQLite "database is locked"
+                return "error"
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=opts["workers"]) as pool:
+            results = list(pool.map(buy, range(opts["buyers"])))
+        elapsed = time.perf_counter() - started
+
+        variant.refresh_from_db()
+        held = sum(StockHold.objects.filter(variant=variant).values_list("quantity", flat=True))
+        counts = {k: results.count(k) for k in ("ok", "sold_out", "error")}
+        product.delete()
+
+        self.stdout.write(
+            f"{opts['buyers']} buyers / {opts['workers']} workers on {connection.vendor}: "
+            f"{counts['ok']} reserved, {counts['sold_out']} sold out, {counts['error']} errors "
+            f"in {elapsed:.2f}s ({opts['buyers'] / elapsed:.0f} attempts/s)"
+        )
+        if counts["ok"] != held or held + variant.stock != opts["stock"]:
+            self.stderr.write(self.style.ERROR(f"Stock mismatch: held={held} left={variant.stock}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"No oversell: held={held} left={variant.stock}"))
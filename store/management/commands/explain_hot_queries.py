@@ -0,0 +1,65 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+
+from store.models import Coupon, Order, Payment, Product, ProductImage, Variant
+from store.webhooks import payments_matching
+
+
+def _index_on(model, *columns):
+    """Name of the index Django generated for db_index=True on these columns."""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return next(name for name, c in constraints.items() if c["index"] and c["columns"] == list(columns))
+
+def hot_queries():
+    """(label, queryset, index expected in the plan) for the queries the views run."""
+    return [
+        ("catalog grid", Product.objects.catalog_cards().order_by("-id")[:49], None),
+        ("active products by publish date",
+         Product.objects.filter(status=Product.ACTIVE).order_by("-published_at"), "store_product_status_pub_idx"),
+        ("detail images for product/color",
+         ProductImage.objects.filter(product_id=1, color="Black").order_by("sort_order"), "store_pimg_prod_color_sort_idx"),
+        ("detail variants by price",
+         Variant.objects.filter(product_id=1).order_by("price_gross_cents"), "store_variant_prod_price_idx"),
+        ("coupon by code",
+         Coupon.objects.alias(code_lower=Lower("code")).filter(code_lower="neon10"), "store_coupon_code_lower_idx"),
+        ("user's recent orders",
+         Order.objects.filter(user_id=1).order_by("-created_at"), "store_order_user_created_idx"),
+        ("payment by provider id", Payment.objects.filter(external_id="cs_test_123"), _index_on(Payment, "external_id")),
+        ("webhook worker payment lookup",
+         payments_matching([(Payment.STRIPE, "cs_test_123"), (Payment.PAYPAL, "5O190127TN364715T")]),
+         "store_payment_provider_external_uniq"),
+        ("signup username check",
+         User.objects.alias(u=Lower("username")).filter(u="alice"), "store_auth_user_username_lower_idx"),
+    ]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the store's hot queries and check each one uses its index (SQLite or Postgres)."
+
+    def handle(self, *args, **opts):
+        failures = 0
+        try:
+            with transaction.atomic():
+                if connection.vendor == "postgresql":
+                    # tiny dev tables always seq-scan; ask whether the index is usable at all
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET LOCAL enable_seqscan = off")
+                for label, qs, index in hot_queries():
+                    plan = qs.explain()
+                    ok = index is None or index in plan
+                    failures += not ok
+                    status = self.style.SUCCESS("OK") if ok else self.style.ERROR(f"MISSING {index}")
+                    self.stdout.write(f"== {label}: {status}\n{plan}\n")
+                raise _Rollback
+        except _Rollback:
+            pass
+        if failures:
+            raise CommandError(f"{failures} hot queries don't use their index.")
+        self.stdout.write(self.style.SUCCESS("All hot queries use their indexes."))
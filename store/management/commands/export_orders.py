@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store import exports
+
+
+class Command(BaseCommand):
+    help = "Stream orders with their lines and payment to CSV or JSONL (one row per order line) for VAT filing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start", help="First day, YYYY-MM-DD (inclusive).")
+        parser.add_argument("--to", dest="end", help="Last day, YYYY-MM-DD (inclusive).")
+        parser.add_argument("--status", default=None, help="e.g. paid")
+        parser.add_argument("--format", choices=sorted(exports.FORMATS), default="csv")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument("--output", "-o", default="-", help="File path, or - for stdout.")
+
+    def handle(self, *args, **opts):
+        try:
+            start = exports.parse_day(opts["start"]) if opts["start"] else None
+            end = exports.parse_day(opts["end"], end=True) if opts["end"] else None
+        except ValueError:
+            raise CommandError("Dates must be YYYY-MM-DD.")
+        orders = exports.orders_between(start, end, status=opts["status"])
+        chunks = exports.stream(opts["format"], orders, chunk_size=opts["chunk_size"])
+        if opts["output"] == "-":
+            sys.stdout.writelines(chunks)
+            return
+        with open(opts["output"], "w", newline="", encoding="utf-8") as fh:
+            fh.writelines(chunks)
+        self.stderr.write(f"Wrote {opts['output']}")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.importer import CatalogImportError, import_catalog, read_rows
+
+
+class Command(BaseCommand):
+    help = "Stream products, variants and images from a CSV or JSONL file and upsert them by slug in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"], default=None,
+                            help="Default: taken from the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        path = opts["path"]
+        fmt = opts["format"] or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+        try:
+            with open(path, newline="", encoding="utf-8") as fh:
+                result = import_catalog(read_rows(fh, fmt), chunk_size=opts["chunk_size"])
+        except (OSError, ValueError, CatalogImportError) as exc:
+            raise CommandError(str(exc))
+        for error in result.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.rows} rows in {result.seconds:.2f}s ({result.rows_per_second:,.0f} rows/s): "
+            f"{result.products} products, {result.variants_created} new / {result.variants_updated} updated variants, "
+            f"{result.images} images."
+        ))
@@ -0,0 +1,55 @@
+import csv
+import sys
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from store.models import QRInvite
+
+
+class Command(BaseCommand):
+    help = "Create many QR invites with bulk_create and export token,link,expires_at as CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("count", type=int)
+        parser.add_argument("--max-uses", type=int, default=1)
+        parser.add_argument("--ttl-hours", type=float, default=72.0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--base-url", default=getattr(settings, "PUBLIC_BASE_URL", "https://neonshop.onrender.com"))
+        parser.add_argument("--output", "-o", help="CSV file (default: stdout)")
+
+    def handle(self, *args, **opts):
+        if opts["count"] <= 0:
+            raise CommandError("count must be positive")
+        base = opts["base_url"].rstrip("/")
+        expires_at = timezone.now() + timedelta(hours=opts["ttl_hours"])
+        out = open(opts["output"], "w", newline="") if opts["output"] else sys.stdout
+        writer = csv.writer(out)
+        writer.writerow(["token", "link", "expires_at"])
+
+        started = time.perf_counter()
+        remaining = opts["count"]
+        try:
+            while remaining:
+                n = min(remaining, opts["batch_size"])
+                # bulk_create skips save(), so tokens and expiry are set here
+                batch = [
+                    QRInvite(token=QRInvite.make_token(), expires_at=expires_at, max_uses=opts["max_uses"])
+                    for _ in range(n)
+                ]
+                QRInvite.objects.bulk_create(batch)
+                for inv in batch:
+                    writer.writerow([inv.token, base + reverse("invite", args=[inv.token]), expires_at.isoformat()])
+                remaining -= n
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        elapsed = time.perf_counter() - started
+        self.stderr.write(self.style.SUCCESS(
+            f"Minted {opts['count']} invites in {elapsed:.2f}s ({opts['count'] / elapsed:,.0f}/s)"
+        ))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.webhooks import process_pending
+
+
+class Command(BaseCommand):
+    help = "Apply stored payment webhook events to payments and orders in batches (once, or with --loop)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--loop", action="store_true", help="Keep polling every --interval seconds.")
+        parser.add_argument("--interval", type=float, default=2.0)
+
+    def handle(self, *args, **opts):
+        while True:
+            total = 0
+            while True:
+                seen = process_pending(batch_size=opts["batch_size"])
+                total += seen
+                if seen < opts["batch_size"]:
+                    break
+            if total or not opts["loop"]:
+                self.stdout.write(f"Processed {total} webhook events.")
+            if not opts["loop"]:
+                return
+            time.sleep(opts["interval"])
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from store.maintenance import purge_all
+
+
+class Command(BaseCommand):
+    help = "Delete abandoned carts, stale QR invites and expired sessions in bounded chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cart-days", type=int, default=None, help="Default: settings.CART_RETENTION_DAYS")
+        parser.add_argument("--invite-days", type=int, default=None, help="Default: settings.INVITE_RETENTION_DAYS")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between chunks.")
+
+    def handle(self, *args, **opts):
+        results = purge_all(
+            cart_days=opts["cart_days"], invite_days=opts["invite_days"],
+            chunk_size=opts["chunk_size"], pause=opts["pause"],
+        )
+        for r in results:
+            self.stdout.write(f"{r.name:10} {r.rows:8} rows in {r.seconds:6.2f}s ({r.rows_per_second:,.0f} rows/s)")
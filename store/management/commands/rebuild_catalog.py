@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from store.models import Product, ProductCard, Variant, VariantOption
+from store.search import index_products
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized catalog tables: ProductCard rows, the VariantOption facet index and the search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        chunk = opts["chunk_size"]
+        ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+        cards = options = documents = 0
+        for i in range(0, len(ids), chunk):
+            batch = ids[i:i + chunk]
+            cards += ProductCard.objects.refresh(batch)
+            options += VariantOption.objects.sync(
+                Variant.objects.filter(product_id__in=batch).only("id", "product_id", "attrs")
+            )
+            documents += index_products(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {cards} product cards, {options} variant options and {documents} search documents."
+        ))
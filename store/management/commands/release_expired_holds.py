@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = "Return the stock of expired StockHolds in batches (run from cron, or with --loop)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--loop", action="store_true", help="Keep sweeping every --interval seconds.")
+        parser.add_argument("--interval", type=float, default=30.0)
+
+    def handle(self, *args, **opts):
+        while True:
+            released = release_expired(batch_size=opts["batch_size"])
+            if released or not opts["loop"]:
+                self.stdout.write(f"Released {released} expired holds.")
+            if not opts["loop"]:
+                return
+            time.sleep(opts["interval"])
@@ -0,0 +1,37 @@
+import json
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from store.models import Payment
+from store.webhooks import InvalidWebhook, store
+
+
+class Command(BaseCommand):
+    help = (
+        "Load recorded webhook payloads into the inbox without a network or signatures. "
+        "Input is JSONL with one {\"provider\": ..., \"payload\": {...}} object per line."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--process", action="store_true", help="Run process_webhooks afterwards.")
+
+    def handle(self, *args, **opts):
+        providers = {p for p, _ in Payment.PROVIDERS}
+        count = 0
+        with open(opts["path"], encoding="utf-8") as fh:
+            for n, line in enumerate(fh, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    if record.get("provider") not in providers:
+                        raise InvalidWebhook(f"unknown provider {record.get('provider')!r}")
+                    store(record["provider"], record["payload"])
+                except (ValueError, KeyError, InvalidWebhook) as exc:
+                    raise CommandError(f"line {n}: {exc}")
+                count += 1
+        self.stdout.write(f"Stored {count} recorded events (duplicates ignored).")
+        if opts["process"]:
+            call_command("process_webhooks", stdout=self.stdout)
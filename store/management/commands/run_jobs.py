@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = "Run due background jobs (queued mail etc.) in batches (once, or with --loop)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--loop", action="store_true", help="Keep polling every --interval seconds.")
+        parser.add_argument("--interval", type=float, default=1.0)
+
+    def handle(self, *args, **opts):
+        while True:
+            started = time.perf_counter()
+            done = failed = 0
+            while True:
+                d, f = run_pending(batch_size=opts["batch_size"])
+                done, failed = done + d, failed + f
+                if d + f < opts["batch_size"]:
+                    break
+            seconds = time.perf_counter() - started
+            if done or failed or not opts["loop"]:
+                rate = done / seconds if seconds else 0.0
+                self.stdout.write(f"Ran {done} jobs ({failed} failed) in {seconds:.2f}s ({rate:,.0f} jobs/s).")
+            if not opts["loop"]:
+                return
+            time.sleep(opts["interval"])
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+def backfill_cards(apps, schema_editor):
+    # frozen copy of ProductCard.objects.refresh(): existing products must not
+    # render as sold out until someone runs rebuild_catalog
+    Product = apps.get_model('store', 'Product')
+    Variant = apps.get_model('store', 'Variant')
+    ProductImage = apps.get_model('store', 'ProductImage')
+    Heart = apps.get_model('store', 'Heart')
+    ProductCard = apps.get_model('store', 'ProductCard')
+    db = schema_editor.connection.alias
+    ids = list(Product.objects.using(db).order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), 500):
+        batch = ids[start:start + 500]
+        stats = {
+            row['product_id']: row
+            for row in Variant.objects.using(db).filter(product_id__in=batch).values('product_id')
+            .annotate(lo=Min('price_gross_cents'), hi=Max('price_gross_cents'), stock=Sum('stock'))
+        }
+        options = {}
+        for pid, attrs in (Variant.objects.using(db).filter(product_id__in=batch)
+                           .order_by('price_gross_cents', 'id').values_list('product_id', 'attrs')):
+            colors, sizes = options.setdefault(pid, ([], []))
+            attrs = attrs or {}
+            if attrs.get('color') and attrs['color'] not in colors:
+                colors.append(attrs['color'])
+            if attrs.get('size') and attrs['size'] not in sizes:
+                sizes.append(attrs['size'])
+        images = {}
+        for pid, url, alt in (ProductImage.objects.using(db).filter(product_id__in=batch)
+                              .order_by('product_id', 'sort_order', 'id').values_list('product_id', 'url', 'alt')):
+            images.setdefault(pid, (url, alt))
+        hearts = dict(Heart.objects.using(db).filter(product_id__in=batch).values('product_id')
+                      .annotate(n=Count('id')).values_list('product_id', 'n'))
+        ProductCard.objects.using(db).bulk_create([
+            ProductCard(
+                product_id=pid,
+                min_price_cents=stats.get(pid, {}).get('lo'),
+                max_price_cents=stats.get(pid, {}).get('hi'),
+                total_stock=stats.get(pid, {}).get('stock') or 0,
+                main_image_url=images.get(pid, ('', ''))[0] or '',
+                main_image_alt=images.get(pid, ('', ''))[1] or '',
+                hearts_count=hearts.get(pid, 0),
+                colors=options.get(pid, ([], []))[0],
+                sizes=options.get(pid, ([], []))[1],
+            )
+            for pid in batch
+        ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_coupon'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='store.product')),
+                ('min_price_cents', models.PositiveIntegerField(blank=True, null=True)),
+                ('max_price_cents', models.PositiveIntegerField(blank=True, null=True)),
+                ('total_stock', models.PositiveIntegerField(default=0)),
+                ('main_image_url', models.URLField(blank=True)),
+                ('main_image_alt', models.CharField(blank=True, max_length=200)),
+                ('hearts_count', models.PositiveIntegerField(default=0)),
+                ('colors', models.JSONField(blank=True, default=list)),
+                ('sizes', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:08
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_stockhold'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coupon',
+            index=models.Index(django.db.models.functions.text.Lower('code'), name='store_coupon_code_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_variant_attrs_gin(apps, schema_editor):
+    # GIN over the attrs JSON only exists on Postgres (used by attrs containment filters)
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS store_variant_attrs_gin ON store_variant USING GIN (attrs)"
+        )
+
+def drop_variant_attrs_gin(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS store_variant_attrs_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_cart_user_optional'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='external_id',
+            field=models.CharField(blank=True, db_index=True, max_length=200),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at'], name='store_order_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'published_at'], name='store_product_status_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productimage',
+            index=models.Index(fields=['product', 'color', 'sort_order'], name='store_pimg_prod_color_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='variant',
+            index=models.Index(fields=['product', 'price_gross_cents'], name='store_variant_prod_price_idx'),
+        ),
+        # signup checks lower(username); auth_user has no such index of its own
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS store_auth_user_username_lower_idx ON auth_user (lower(username))",
+            "DROP INDEX IF EXISTS store_auth_user_username_lower_idx",
+        ),
+        migrations.RunPython(create_variant_attrs_gin, drop_variant_attrs_gin),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_options(apps, schema_editor):
+    # frozen copy of VariantOption.objects.sync() for the variants that already exist
+    Variant = apps.get_model('store', 'Variant')
+    VariantOption = apps.get_model('store', 'VariantOption')
+    db = schema_editor.connection.alias
+    rows = []
+    for v in Variant.objects.using(db).only('id', 'product_id', 'attrs').iterator(chunk_size=2000):
+        for name, label in (v.attrs or {}).items():
+            if name in ('color', 'size') and label not in (None, ''):
+                rows.append(VariantOption(variant_id=v.pk, product_id=v.product_id, name=name,
+                                          value=str(label).strip().lower()[:100], label=str(label)[:100]))
+        if len(rows) >= 2000:
+            VariantOption.objects.using(db).bulk_create(rows, ignore_conflicts=True)
+            rows = []
+    VariantOption.objects.using(db).bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VariantOption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=40)),
+                ('value', models.CharField(max_length=100)),
+                ('label', models.CharField(max_length=100)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='options', to='store.product')),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='options', to='store.variant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'value', 'variant'], name='store_vopt_name_value_idx')],
+                'constraints': [models.UniqueConstraint(fields=('variant', 'name'), name='store_variantoption_variant_name_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_options, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Search index tables for store.search (not Django models: FTS5 / tsvector storage)
+
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            if "ENABLE_FTS5" not in {row[0] for row in cursor.fetchall()}:
+                return  # store.search falls back to LIKE
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS store_product_fts "
+            "USING fts5(title, body, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS store_productsearch ("
+            " product_id bigint PRIMARY KEY REFERENCES store_product (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,"
+            " document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS store_productsearch_document_gin ON store_productsearch USING GIN (document)"
+        )
+
+def index_existing_products(apps, schema_editor):
+    # same documents as store.search._documents(): title, then description + variant attrs
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite":
+        if "store_product_fts" not in connection.introspection.table_names():
+            return
+        sql = "INSERT INTO store_product_fts (rowid, title, body) VALUES (%s, %s, %s)"
+    elif connection.vendor == "postgresql":
+        sql = (
+            "INSERT INTO store_productsearch (product_id, document) VALUES "
+            "(%s, setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')) "
+            "ON CONFLICT (product_id) DO NOTHING"
+        )
+    else:
+        return
+    Product = apps.get_model("store", "Product")
+    Variant = apps.get_model("store", "Variant")
+    db = connection.alias
+    ids = list(Product.objects.using(db).order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(ids), 500):
+        batch = ids[start:start + 500]
+        attrs = {}
+        for pid, a in Variant.objects.using(db).filter(product_id__in=batch).values_list("product_id", "attrs"):
+            attrs.setdefault(pid, set()).update(str(v) for v in (a or {}).values() if v)
+        docs = [
+            (pid, title, " ".join([description, *sorted(attrs.get(pid, ()))]))
+            for pid, title, description in Product.objects.using(db).filter(pk__in=batch).values_list("pk", "title", "description")
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, docs)
+
+def drop_search_table(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS store_product_fts")
+    elif vendor == "postgresql":
+        schema_editor.execute("DROP TABLE IF EXISTS store_productsearch")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_variantoption'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+        migrations.RunPython(index_existing_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_admin_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('dimension', models.CharField(choices=[('day', 'Day'), ('product', 'Product'), ('vat_rate', 'VAT rate'), ('provider', 'Payment provider')], max_length=10)),
+                ('key', models.CharField(blank=True, max_length=200)),
+                ('label', models.CharField(blank=True, max_length=200)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('gross_cents', models.BigIntegerField(default=0)),
+                ('net_cents', models.BigIntegerField(default=0)),
+                ('vat_cents', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'day', 'key'), name='store_rollup_dim_day_key_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_cache_table'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='holds_released_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='needs_attention',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='variant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='store.variant'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('needs_attention', True)), fields=['id'], name='store_order_attention_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_late_payment_stock'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='webhookevent',
+            name='store_webhook_pending_idx',
+        ),
+        migrations.AddField(
+            model_name='webhookevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='webhookevent',
+            index=models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['next_attempt_at', 'id'], name='store_webhook_due_idx'),
+        ),
+    ]
@@ -2,12 +2,29 @@ import secrets
 from datetime import timedelta
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models.functions import Lower
 from django.utils import timezone
 from django.urls import reverse
 
 User = get_user_model()
 
+class QRInviteQuerySet(models.QuerySet):
+    def valid(self, now=None):
+        now = now or timezone.now()
+        return self.filter(uses__lt=models.F("max_uses"), expires_at__gt=now)
+
+    def redeem(self, token, user=None):
+        """
+        Consume one use of an invite with a single conditional UPDATE
+        (uses < max_uses AND expires_at > now), so concurrent scans can't
+        over-redeem. Returns False if the token is unknown, spent or expired.
+        """
+        now = timezone.now()
+        return bool(self.valid(now).filter(token=token).update(
+            uses=models.F("uses") + 1, used_by=user, used_at=now,
+        ))
+
 class QRInvite(models.Model):
     token = models.CharField(max_length=64, unique=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -17,9 +34,15 @@ class QRInvite(models.Model):
     max_uses = models.PositiveIntegerField(default=1)
     uses = models.PositiveIntegerField(default=0)
 
+    objects = QRInviteQuerySet.as_manager()
+
+    @staticmethod
+    def make_token():
+        return secrets.token_urlsafe(32)
+
     def save(self, *args, **kwargs):
         if not self.token:
-            self.token = secrets.token_urlsafe(32)
+            self.token = self.make_token()
         if not self.expires_at:
             self.expires_at = timezone.now() + timedelta(minutes=30)
         super().save(*args, **kwargs)
@@ -36,6 +59,29 @@ class QRInvite(models.Model):
     def __str__(self):
         return f"Invite {self.token[:8]}.. (valid={self.is_valid()})"
 
+class ProductQuerySet(models.QuerySet):
+    def catalog_cards(self):
+        """Grid cards: one narrow row per product, joined from ProductCard."""
+        return self.select_related("card").only(
+            "id", "title", "slug",
+            "card__min_price_cents", "card__total_stock",
+            "card__main_image_url", "card__main_image_alt", "card__hearts_count",
+        )
+
+    def card_stats(self):
+        """Live ProductCard values computed from variants, images and hearts."""
+        images = ProductImage.objects.filter(product=models.OuterRef("pk")).order_by("sort_order", "id")
+        hearts = (Heart.objects.filter(product=models.OuterRef("pk"))
+                  .order_by().values("product").annotate(n=models.Count("id")).values("n"))
+        return self.annotate(
+            main_image_url=models.Subquery(images.values("url")[:1]),
+            main_image_alt=models.Subquery(images.values("alt")[:1]),
+            min_price_cents=models.Min("variants__price_gross_cents"),
+            max_price_cents=models.Max("variants__price_gross_cents"),
+            total_stock=models.Sum("variants__stock"),
+            hearts_total=models.Subquery(hearts),
+        )
+
 class Product(models.Model):
     DRAFT, ACTIVE, ARCHIVED = "draft", "active", "archived"
     STATUS_CHOICES = [(DRAFT, "Draft"), (ACTIVE, "Active"), (ARCHIVED, "Archived")]
@@ -46,11 +92,22 @@ class Product(models.Model):
     published_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "published_at"], name="store_product_status_pub_idx"),
+        ]
+
     def main_image(self):
         return self.images.order_by("sort_order").first()
 
     def hearts_count(self):
-        return self.hearts.count()
+        # denormalized on the card (store.signals keeps it in step with Heart rows)
+        try:
+            return self.card.hearts_count
+        except ProductCard.DoesNotExist:
+            return self.hearts.count()
 
     def __str__(self):
         return self.title
@@ -68,6 +125,11 @@ class ProductImage(models.Model):
         help_text="Optional: tie this image to a color (e.g. 'Black'). Leave blank for generic images."
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "color", "sort_order"], name="store_pimg_prod_color_sort_idx"),
+        ]
+
 # store/models.py
 
 class Variant(models.Model):
@@ -76,6 +138,11 @@ class Variant(models.Model):
     stock = models.PositiveIntegerField(default=0)
     attrs = models.JSONField(default=dict, blank=True)  # {"color":"Black","size":"EU 43"}
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "price_gross_cents"], name="store_variant_prod_price_idx"),
+        ]
+
     def __str__(self):
         s = (self.attrs or {}).get("size")
         c = (self.attrs or {}).get("color")
@@ -92,23 +159,202 @@ class Variant(models.Model):
         return (self.attrs or {}).get("color")
 
 
+FACET_ATTRS = ("color", "size")
+
+def normalize_option(value) -> str:
+    return str(value).strip().lower()
+
+class VariantOptionQuerySet(models.QuerySet):
+    def sync(self, variants):
+        """Replace the option rows of these variants from their attrs (2 queries)."""
+        variants = list(variants)
+        self.filter(variant__in=[v.pk for v in variants]).delete()
+        rows = [
+            VariantOption(variant_id=v.pk, product_id=v.product_id, name=name,
+                          value=normalize_option(label)[:100], label=str(label)[:100])
+            for v in variants
+            for name, label in (v.attrs or {}).items()
+            if name in FACET_ATTRS and label not in (None, "")
+        ]
+        return len(self.bulk_create(rows))
+
+class VariantOption(models.Model):
+    """One row per (variant, facet) from Variant.attrs, so catalog filters never parse JSON."""
+    variant = models.ForeignKey(Variant, related_name="options", on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name="options", on_delete=models.CASCADE)  # denormalized for counts
+    name = models.CharField(max_length=40)    # "color", "size"
+    value = models.CharField(max_length=100)  # normalized, used for matching
+    label = models.CharField(max_length=100)  # as entered, used for display
+
+    objects = VariantOptionQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["variant", "name"], name="store_variantoption_variant_name_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["name", "value", "variant"], name="store_vopt_name_value_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name}={self.label} (variant #{self.variant_id})"
+
+class ProductCardQuerySet(models.QuerySet):
+    def refresh(self, product_ids):
+        """Recompute the cards of the given products (upsert; 2 queries per batch)."""
+        product_ids = set(product_ids)
+        if not product_ids:
+            return 0
+        options = {}
+        for pid, attrs in Variant.objects.filter(product_id__in=product_ids).order_by("price_gross_cents", "id").values_list("product_id", "attrs"):
+            colors, sizes = options.setdefault(pid, ([], []))
+            attrs = attrs or {}
+            if attrs.get("color") and attrs["color"] not in colors:
+                colors.append(attrs["color"])
+            if attrs.get("size") and attrs["size"] not in sizes:
+                sizes.append(attrs["size"])
+
+        cards = []
+        for p in Product.objects.filter(pk__in=product_ids).card_stats():
+            colors, sizes = options.get(p.pk, ([], []))
+            cards.append(ProductCard(
+                product_id=p.pk,
+                min_price_cents=p.min_price_cents,
+                max_price_cents=p.max_price_cents,
+                total_stock=p.total_stock or 0,
+                main_image_url=p.main_image_url or "",
+                main_image_alt=p.main_image_alt or "",
+                hearts_count=p.hearts_total or 0,
+                colors=colors,
+                sizes=sizes,
+            ))
+        self.bulk_create(
+            cards, update_conflicts=True, unique_fields=["product"],
+            update_fields=[
+                "min_price_cents", "max_price_cents", "total_stock", "main_image_url",
+                "main_image_alt", "hearts_count", "colors", "sizes", "updated_at",
+            ],
+        )
+        return len(cards)
+
+class ProductCard(models.Model):
+    """Denormalized listing row per product; kept in sync by store.signals."""
+    product = models.OneToOneField(Product, primary_key=True, related_name="card", on_delete=models.CASCADE)
+    min_price_cents = models.PositiveIntegerField(null=True, blank=True)
+    max_price_cents = models.PositiveIntegerField(null=True, blank=True)
+    total_stock = models.PositiveIntegerField(default=0)
+    main_image_url = models.URLField(blank=True)
+    main_image_alt = models.CharField(max_length=200, blank=True)
+    hearts_count = models.PositiveIntegerField(default=0)
+    colors = models.JSONField(default=list, blank=True)
+    sizes = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductCardQuerySet.as_manager()
+
+    @property
+    def in_stock(self):
+        return self.total_stock > 0
+
+    def __str__(self):
+        return f"Card for product #{self.product_id}"
+
+
+class HeartQuerySet(models.QuerySet):
+    def toggle(self, user, product_id):
+        """Heart or un-heart a product; returns True if it is hearted afterwards."""
+        if self.filter(user=user, product_id=product_id).delete()[0]:
+            return False
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(user=user, product_id=product_id)
+        except IntegrityError:  # a concurrent click already hearted it
+            pass
+        return True
+
+    def hearted_ids(self, user, product_ids):
+        """Which of these products the user has hearted, in one query."""
+        if not user.is_authenticated or not product_ids:
+            return set()
+        return set(self.filter(user=user, product_id__in=product_ids).values_list("product_id", flat=True))
+
 class Heart(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, related_name="hearts", on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = HeartQuerySet.as_manager()
+
     class Meta:
         unique_together = ("user", "product")
 
+class CartQuerySet(models.QuerySet):
+    def merge_anonymous(self, cart_id, user):
+        """
+        Fold an anonymous cart into the user's cart: one INSERT .. SELECT upsert
+        that sums quantities per variant, then drop the anonymous cart.
+        Returns the user's cart, or None if there was nothing to merge.
+        """
+        if not CartItem.objects.filter(cart_id=cart_id, cart__user__isnull=True).exists():
+            self.filter(pk=cart_id, user__isnull=True).delete()
+            return None
+        with transaction.atomic(using=self.db):
+            cart, _ = self.get_or_create(user=user)
+            CartItem.objects.copy_lines(cart_id, cart.pk)
+            self.filter(pk=cart_id, user__isnull=True).delete()
+        return cart
+
 class Cart(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="cart")
+    # user is empty for anonymous carts, which are referenced from the session ("cart_id")
+    user = models.OneToOneField(User, null=True, blank=True, on_delete=models.CASCADE, related_name="cart")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CartQuerySet.as_manager()
+
+class CartItemQuerySet(models.QuerySet):
+    def add_variants(self, cart_id, quantities):
+        """
+        Upsert {variant_id: qty} into a cart with a single INSERT .. ON CONFLICT,
+        adding onto existing lines. Unknown variant ids are skipped.
+        Returns the number of cart lines inserted or updated.
+        """
+        quantities = {int(vid): int(qty) for vid, qty in quantities.items() if int(qty) > 0}
+        if not quantities:
+            return 0
+        qn = connections[self.db].ops.quote_name
+        item, variant = qn(CartItem._meta.db_table), qn(Variant._meta.db_table)
+        rows = " UNION ALL ".join(["SELECT CAST(%s AS BIGINT) AS vid, CAST(%s AS INTEGER) AS qty"] * len(quantities))
+        sql = (
+            f"INSERT INTO {item} (cart_id, variant_id, quantity) "
+            f"SELECT %s, v.id, q.qty FROM ({rows}) q JOIN {variant} v ON v.id = q.vid "
+            f"WHERE 1 = 1 "  # lets SQLite parse the ON CONFLICT clause after a SELECT
+            f"ON CONFLICT (cart_id, variant_id) DO UPDATE SET quantity = {item}.quantity + excluded.quantity"
+        )
+        params = [p for pair in quantities.items() for p in pair]
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, [cart_id, *params])
+            return cursor.rowcount
+
+    def copy_lines(self, from_cart_id, to_cart_id):
+        """Add every line of one cart onto another (same upsert as add_variants)."""
+        qn = connections[self.db].ops.quote_name
+        item = qn(CartItem._meta.db_table)
+        sql = (
+            f"INSERT INTO {item} (cart_id, variant_id, quantity) "
+            f"SELECT %s, variant_id, quantity FROM {item} WHERE cart_id = %s "
+            f"ON CONFLICT (cart_id, variant_id) DO UPDATE SET quantity = {item}.quantity + excluded.quantity"
+        )
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, [to_cart_id, from_cart_id])
+            return cursor.rowcount
+
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, related_name="items", on_delete=models.CASCADE)
     variant = models.ForeignKey(Variant, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         unique_together = ("cart", "variant")
 
@@ -119,6 +365,11 @@ class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.PROTECT)
     created_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=NEW)
+    paid_at = models.DateTimeField(null=True, blank=True)
+    # set by the hold sweeper when it gives an unpaid order's stock back
+    holds_released_at = models.DateTimeField(null=True, blank=True)
+    # paid, but its stock could not be taken again (store.reservations.settle)
+    needs_attention = models.BooleanField(default=False)
 
     # VAT / totals (in cents)
     vat_rate = models.FloatField(default=settings.GERMANY_STANDARD_VAT)
@@ -137,11 +388,34 @@ class Order(models.Model):
     postal_code = models.CharField(max_length=20)
     country = models.CharField(max_length=2, default=settings.HOME_COUNTRY)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="store_order_user_created_idx"),
+            models.Index(fields=["status", "created_at"], name="store_order_status_created_idx"),
+            models.Index(fields=["created_at"], name="store_order_created_idx"),  # admin date_hierarchy, exports
+            models.Index(fields=["id"], condition=models.Q(needs_attention=True), name="store_order_attention_idx"),
+        ]
+
     def __str__(self):
         return f"Order #{self.pk} {self.user} {self.status}"
 
+    def mark_paid(self, when=None):
+        """
+        Move the order to PAID exactly once (conditional UPDATE) and add it to
+        the sales rollups in the same transaction. Returns False if it was
+        already paid, so replayed payment events can't count an order twice.
+        """
+        when = when or timezone.now()
+        with transaction.atomic():
+            if not Order.objects.filter(pk=self.pk).exclude(status=self.PAID).update(status=self.PAID, paid_at=when):
+                return False
+            self.status, self.paid_at = self.PAID, when
+            SalesRollup.objects.record(self)
+        return True
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name="items", on_delete=models.CASCADE)
+    variant = models.ForeignKey(Variant, null=True, blank=True, related_name="order_items", on_delete=models.SET_NULL)
     product_title = models.CharField(max_length=200)
     sku = models.CharField(max_length=64)
     attrs = models.JSONField(default=dict, blank=True)
@@ -154,16 +428,28 @@ class OrderItem(models.Model):
 class Payment(models.Model):
     STRIPE, PAYPAL, COINBASE = "stripe", "paypal", "coinbase"
     PROVIDERS = [(STRIPE, "Stripe"), (PAYPAL, "PayPal"), (COINBASE, "Coinbase")]
+    CREATED, PAID, FAILED = "created", "paid", "failed"
+    STATUSES = [(CREATED, "Created"), (PAID, "Paid"), (FAILED, "Failed")]
 
     order = models.OneToOneField(Order, related_name="payment", on_delete=models.CASCADE)
     provider = models.CharField(max_length=10, choices=PROVIDERS)
-    status = models.CharField(max_length=20, default="created")
+    status = models.CharField(max_length=20, choices=STATUSES, default=CREATED)
     amount_cents = models.PositiveIntegerField(default=0)
     currency = models.CharField(max_length=3, default="EUR")
-    external_id = models.CharField(max_length=200, blank=True)  # checkout session id / paypal order id / coinbase charge id
+    external_id = models.CharField(max_length=200, blank=True, db_index=True)  # checkout session id / paypal order id / coinbase charge id
     receipt_url = models.URLField(blank=True)
     raw = models.JSONField(default=dict, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["provider", "status"], name="store_payment_prov_status_idx"),
+        ]
+        constraints = [
+            # webhooks look payments up by (provider, external id); blank = not created at the provider yet
+            models.UniqueConstraint(fields=["provider", "external_id"], condition=~models.Q(external_id=""),
+                                    name="store_payment_provider_external_uniq"),
+        ]
+
     def valid(self):
         now = timezone.now()
         return self.filter(active=True).filter(
@@ -171,6 +457,179 @@ class Payment(models.Model):
             models.Q(valid_to__isnull=True)   | models.Q(valid_to__gte=now),
         )
 
+class WebhookEvent(models.Model):
+    """
+    Inbox of verified payment provider events. The webhook views only insert
+    here (duplicates are dropped by the unique constraint) and return 200;
+    `manage.py process_webhooks` applies them to Payment/Order (store.webhooks).
+    """
+    provider = models.CharField(max_length=10, choices=Payment.PROVIDERS)
+    event_id = models.CharField(max_length=200)
+    event_type = models.CharField(max_length=100, blank=True)
+    payload = models.JSONField(default=dict)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["provider", "event_id"], name="store_webhook_provider_event_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["next_attempt_at", "id"], condition=models.Q(processed_at__isnull=True),
+                         name="store_webhook_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event_type} {self.event_id}"
+
+class Job(models.Model):
+    """
+    A durable background job (store.jobs). Done jobs are deleted; jobs that
+    run out of attempts stay behind with failed_at and last_error set.
+    """
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    run_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    locked_by = models.CharField(max_length=32, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["run_after", "id"], condition=models.Q(failed_at__isnull=True),
+                         name="store_job_pending_idx"),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.pk} {self.kind}"
+
+class SalesRollupQuerySet(models.QuerySet):
+    def rows_for(self, order):
+        """(day, dimension, key, label, orders, quantity, gross, net, vat) rows for one paid order."""
+        day = timezone.localdate(order.paid_at or order.created_at)
+        items = list(order.items.all())
+        try:
+            provider = order.payment.provider
+        except Payment.DoesNotExist:
+            provider = ""
+        quantity = sum(i.quantity for i in items)
+        totals = (1, quantity, order.gross_total, order.net_total, order.vat_total)
+        rate = f"{order.vat_rate * 100:.2f}"
+        rows = [
+            (day, SalesRollup.DAY, "", "", *totals),
+            (day, SalesRollup.VAT_RATE, rate, f"{rate} %", *totals),
+            (day, SalesRollup.PROVIDER, provider, provider or "(none)", *totals),
+        ]
+        products = {}
+        for i in items:
+            key = SalesRollup.product_key(i.sku)
+            label, qty, gross, net, vat = products.get(key, (i.product_title, 0, 0, 0, 0))
+            products[key] = (label, qty + i.quantity, gross + i.price_gross_cents * i.quantity,
+                             net + i.price_net_cents * i.quantity, vat + i.vat_amount_cents * i.quantity)
+        rows += [(day, SalesRollup.PRODUCT, key, label, 1, *sums) for key, (label, *sums) in products.items()]
+        return rows
+
+    def add(self, rows, batch_size=500):
+        """Add rows onto the rollups: INSERT .. ON CONFLICT DO UPDATE SET x = x + excluded.x, per batch."""
+        if not rows:
+            return 0
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        table = qn(SalesRollup._meta.db_table)
+        cols = ["day", "dimension", "key", "label", "orders", "quantity", "gross_cents", "net_cents", "vat_cents"]
+        sums = ", ".join(f"{qn(c)} = {table}.{qn(c)} + excluded.{qn(c)}" for c in cols[4:])
+        sql = (
+            f"INSERT INTO {table} ({', '.join(qn(c) for c in cols)}) VALUES {{values}} "
+            f"ON CONFLICT ({qn('dimension')}, {qn('day')}, {qn('key')}) "
+            f"DO UPDATE SET {sums}, {qn('label')} = excluded.{qn('label')}"
+        )
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                placeholders = ", ".join(["(" + ", ".join(["%s"] * len(cols)) + ")"] * len(batch))
+                params = [
+                    connection.ops.adapt_datefield_value(v) if n == 0 else v
+                    for row in batch for n, v in enumerate(row)
+                ]
+                cursor.execute(sql.format(values=placeholders), params)
+        return len(rows)
+
+    def record(self, order):
+        return self.add(self.rows_for(order))
+
+    def backfill(self, orders, chunk_size=1000):
+        """
+        Add already-paid orders to the rollups, merging each chunk in memory
+        first. Callers delete the affected days beforehand. Returns the order count.
+        """
+        merged, count = {}, 0
+        orders = orders.select_related("payment").prefetch_related("items")
+        for order in orders.iterator(chunk_size=chunk_size):
+            for day, dimension, key, label, *sums in self.rows_for(order):
+                prev = merged.get((day, dimension, key))
+                merged[(day, dimension, key)] = [label, *(
+                    (a + b for a, b in zip(prev[1:], sums)) if prev else sums
+                )]
+            count += 1
+            if count % chunk_size == 0:
+                self.add([(*k, *v) for k, v in merged.items()])
+                merged = {}
+        self.add([(*k, *v) for k, v in merged.items()])
+        return count
+
+class SalesRollup(models.Model):
+    """
+    Paid-order totals pre-aggregated per day and dimension. Written by
+    Order.mark_paid() (or `manage.py backfill_rollups`) and read by the admin
+    sales report, so reporting never scans Order/OrderItem.
+    """
+    DAY, PRODUCT, VAT_RATE, PROVIDER = "day", "product", "vat_rate", "provider"
+    DIMENSIONS = [(DAY, "Day"), (PRODUCT, "Product"), (VAT_RATE, "VAT rate"), (PROVIDER, "Payment provider")]
+
+    day = models.DateField()
+    dimension = models.CharField(max_length=10, choices=DIMENSIONS)
+    key = models.CharField(max_length=200, blank=True)    # "" / product slug / "19.00" / "stripe"
+    label = models.CharField(max_length=200, blank=True)  # for display
+    orders = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    gross_cents = models.BigIntegerField(default=0)
+    net_cents = models.BigIntegerField(default=0)
+    vat_cents = models.BigIntegerField(default=0)
+
+    objects = SalesRollupQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dimension", "day", "key"], name="store_rollup_dim_day_key_uniq"),
+        ]
+
+    @staticmethod
+    def product_key(sku):
+        # OrderItem.sku is "<product slug>-<variant id>" (store.checkout)
+        return sku.rsplit("-", 1)[0]
+
+    def __str__(self):
+        return f"{self.day} {self.dimension} {self.label or self.key}"
+
+class StockHold(models.Model):
+    """Units taken out of Variant.stock for a cart or order until expires_at (see store.reservations)."""
+    variant = models.ForeignKey(Variant, related_name="holds", on_delete=models.CASCADE)
+    cart = models.ForeignKey(Cart, null=True, blank=True, related_name="holds", on_delete=models.SET_NULL)
+    order = models.ForeignKey(Order, null=True, blank=True, related_name="holds", on_delete=models.SET_NULL)
+    quantity = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Hold {self.quantity}x variant #{self.variant_id} until {self.expires_at:%H:%M}"
+
 class CouponQuerySet(models.QuerySet):
     def valid(self):
         now = timezone.now()
@@ -191,9 +650,22 @@ class Coupon(models.Model):
 
     objects = CouponQuerySet.as_manager()
 
+    class Meta:
+        indexes = [
+            # lookups go through lower(code), see store.coupons
+            models.Index(Lower("code"), name="store_coupon_code_lower_idx"),
+        ]
+
     def __str__(self):
         return self.code
 
+    def is_valid(self, now=None):
+        """Same rules as CouponQuerySet.valid(), for an already-loaded coupon."""
+        now = now or timezone.now()
+        return (self.active
+                and (self.valid_from is None or self.valid_from <= now)
+                and (self.valid_to is None or self.valid_to >= now))
+
     def clean(self):
         # Ensure only one discount type is set
         from django.core.exceptions import ValidationError
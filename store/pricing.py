@@ -0,0 +1,70 @@
+# store/pricing.py
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db.models import Sum
+
+from .catalog import bump_generation, generation, get_versioned, set_versioned
+from .models import CartItem
+from .utils import split_vat_from_gross
+
+CART_COUNT_TTL = 60 * 10
+
+
+@dataclass
+class CartTotals:
+    count: int     # units in cart
+    subtotal: int  # cents, as listed (gross if PRICES_INCLUDE_VAT)
+    discount: int  # cents
+    net: int       # cents
+    vat: int       # cents
+    gross: int     # cents
+    vat_rate: float
+
+    @property
+    def vat_percent(self):
+        return self.vat_rate * 100
+
+
+def compute_totals(subtotal_cents: int, discount_cents: int = 0, count: int = 0) -> CartTotals:
+    """Subtotal -> discount -> net/VAT/gross, in exact integer cents."""
+    vat_rate = float(getattr(settings, "GERMANY_STANDARD_VAT", 0.19))
+    discount_cents = min(discount_cents, subtotal_cents)
+    after_discount = subtotal_cents - discount_cents
+
+    if getattr(settings, "PRICES_INCLUDE_VAT", True):
+        split = split_vat_from_gross(after_discount, vat_rate)
+        net, vat, gross = split.net, split.vat, split.gross
+    else:
+        net = after_discount
+        vat = (net * round(vat_rate * 10000) * 2 + 10000) // 20000
+        gross = net + vat
+    return CartTotals(count=count, subtotal=subtotal_cents, discount=discount_cents,
+                      net=net, vat=vat, gross=gross, vat_rate=vat_rate)
+
+
+# =========================================
+# NAV BADGE COUNT (cached per cart revision)
+# =========================================
+
+def cart_revision(cart_id: int) -> int:
+    return generation(f"cart:{cart_id}:rev")
+
+def bump_cart(cart_id: int):
+    """Call after any change to the cart's lines."""
+    return bump_generation(f"cart:{cart_id}:rev")
+
+def cart_count(cart_id) -> int:
+    """
+    Units in the cart for the header badge, cached per cart revision in the
+    shared cache. Money is never cached: the cart page sums the lines it loads.
+    """
+    if not cart_id:
+        return 0
+    key = f"cart:{cart_id}:count"
+    # deleted variants drop lines too, so the catalog generation is part of the version
+    count, gens = get_versioned(key, f"cart:{cart_id}:rev", "catalog:gen")
+    if count is None:
+        count = CartItem.objects.filter(cart_id=cart_id).aggregate(n=Sum("quantity"))["n"] or 0
+        set_versioned(key, gens, count, CART_COUNT_TTL)
+    return count
@@ -0,0 +1,49 @@
+# store/qr.py
+"""
+QR codes rendered in-process and kept in a content-addressed disk cache:
+the file name is the sha256 of (format, encoded data), so a given invite
+link is rendered once and then served straight from disk.
+"""
+import hashlib
+import io
+import os
+import tempfile
+
+from django.conf import settings
+
+try:
+    import qrcode
+    import qrcode.image.svg
+except ImportError:  # optional; views fall back to the hosted QR service
+    qrcode = None
+
+CONTENT_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def qr_digest(data: str, fmt: str) -> str:
+    return hashlib.sha256(f"{fmt}:{data}".encode()).hexdigest()
+
+def render_qr(data: str, fmt: str = "png") -> bytes:
+    if fmt == "svg":
+        img = qrcode.make(data, image_factory=qrcode.image.svg.SvgPathImage, box_size=10, border=2)
+    else:
+        img = qrcode.make(data, box_size=10, border=2)
+    buf = io.BytesIO()
+    img.save(buf)
+    return buf.getvalue()
+
+def cached_path(digest: str, fmt: str):
+    return settings.QR_CACHE_DIR / digest[:2] / f"{digest}.{fmt}"
+
+def qr_file(data: str, fmt: str = "png"):
+    """Path of the rendered QR for data, rendering it on first use."""
+    digest = qr_digest(data, fmt)
+    path = cached_path(digest, fmt)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write-then-rename so concurrent requests never serve a half-written file
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(render_qr(data, fmt))
+        os.replace(tmp, path)
+    return path, digest
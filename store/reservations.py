@@ -0,0 +1,150 @@
+# store/reservations.py
+"""
+Stock reservations for limited drops.
+
+Stock is taken with a conditional UPDATE (stock >= n) so two buyers can never
+both get the last unit, and every reservation is recorded as a StockHold that
+either gets consumed (order paid) or released back into stock when it expires.
+
+The conditional UPDATE here is the source of truth. .update() skips the
+model signals, so after commit every reservation/release refreshes the
+affected ProductCards and product payloads itself, and bumps the catalog
+generation (cached grid pages, API) when a variant sells out or comes back.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+from .catalog import bump_catalog, bump_product
+from .models import Order, ProductCard, StockHold, Variant
+from .utils import skip_locked
+
+
+class OutOfStock(Exception):
+    def __init__(self, variant_ids):
+        self.variant_ids = list(variant_ids)
+        super().__init__(f"Not enough stock for variant(s) {self.variant_ids}")
+
+
+def hold_ttl():
+    return timedelta(minutes=getattr(settings, "STOCK_HOLD_MINUTES", 15))
+
+def _per_variant(quantities):
+    """CASE pk WHEN .. THEN qty expression, so one UPDATE covers many variants."""
+    return Case(
+        *[When(pk=vid, then=Value(qty)) for vid, qty in quantities.items()],
+        default=Value(0), output_field=PositiveIntegerField(),
+    )
+
+def _stock_changed(changed):
+    """
+    changed: {variant_id: stock that means "crossed zero"} for variants just
+    updated. Refresh their products' display stock after commit.
+    """
+    rows = Variant.objects.filter(pk__in=changed.keys()).values_list("pk", "product_id", "stock")
+    product_ids, crossed = set(), False
+    for vid, pid, stock in rows:
+        product_ids.add(pid)
+        crossed = crossed or stock == changed[vid]
+
+    def refresh():
+        ProductCard.objects.refresh(product_ids)
+        for pid in product_ids:
+            bump_product(pid)
+        if crossed:
+            bump_catalog()
+    transaction.on_commit(refresh)
+
+
+def reserve(quantities, *, cart=None, order=None, ttl=None):
+    """
+    Take {variant_id: qty} out of stock and record holds, all-or-nothing.
+    Raises OutOfStock (and changes nothing) if any variant is short.
+    """
+    quantities = {int(vid): int(qty) for vid, qty in quantities.items() if int(qty) > 0}
+    if not quantities:
+        return []
+    expires_at = timezone.now() + (ttl or hold_ttl())
+    needed = _per_variant(quantities)
+    with transaction.atomic():
+        taken = (Variant.objects
+                 .filter(pk__in=quantities.keys(), stock__gte=needed)
+                 .update(stock=F("stock") - needed))
+        if taken != len(quantities):
+            raise OutOfStock(quantities.keys())
+        _stock_changed(dict.fromkeys(quantities, 0))  # sold out
+        return StockHold.objects.bulk_create([
+            StockHold(variant_id=vid, quantity=qty, cart=cart, order=order, expires_at=expires_at)
+            for vid, qty in quantities.items()
+        ])
+
+def release(holds):
+    """Give the units of the given holds (queryset) back to stock and delete them."""
+    with transaction.atomic():
+        rows = list(skip_locked(holds.order_by()).values_list("id", "variant_id", "quantity"))
+        if not rows:
+            return 0
+        returned = {}
+        for _, vid, qty in rows:
+            returned[vid] = returned.get(vid, 0) + qty
+        StockHold.objects.filter(pk__in=[r[0] for r in rows]).delete()
+        Variant.objects.filter(pk__in=returned.keys()).update(stock=F("stock") + _per_variant(returned))
+        _stock_changed(returned)  # stock == what came back: it was sold out
+        return len(rows)
+
+def consume(order):
+    """The order is paid: its holds become real sales, stock stays decremented."""
+    return StockHold.objects.filter(order=order).delete()[0]
+
+def settle(order):
+    """
+    Consume a paid order's holds. Payment can confirm after the holds expired
+    and the sweeper gave the stock back, so whatever is no longer held is
+    taken again with the same conditional reserve(); if that stock is gone
+    the order is flagged needs_attention instead of silently overselling.
+    Returns True if every line is covered.
+    """
+    with transaction.atomic():
+        held = {}
+        for vid, qty in StockHold.objects.filter(order=order).values_list("variant_id", "quantity"):
+            held[vid] = held.get(vid, 0) + qty
+        ordered, unknown = {}, False
+        for vid, qty in order.items.values_list("variant_id", "quantity"):
+            if vid is None:
+                unknown = True  # variant deleted since checkout
+            else:
+                ordered[vid] = ordered.get(vid, 0) + qty
+        missing = {vid: qty - held.get(vid, 0) for vid, qty in ordered.items() if qty > held.get(vid, 0)}
+        consume(order)
+        covered = not unknown  # a line whose variant is gone cannot be fulfilled
+        if missing:
+            try:
+                with transaction.atomic():
+                    reserve(missing, order=order)
+                consume(order)
+            except OutOfStock:
+                covered = False
+        if not covered:
+            Order.objects.filter(pk=order.pk).update(needs_attention=True)
+            order.needs_attention = True
+        return covered
+
+def release_expired(batch_size=500, now=None):
+    """Release expired holds in bounded batches (one short transaction each)."""
+    now = now or timezone.now()
+    total = 0
+    while True:
+        batch = StockHold.objects.filter(expires_at__lte=now).order_by("expires_at")
+        ids = list(batch.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return total
+        with transaction.atomic():
+            # unpaid orders keep waiting for their payment; record that their stock went back
+            Order.objects.filter(status=Order.NEW, holds__pk__in=ids).update(holds_released_at=now)
+            released = release(StockHold.objects.filter(pk__in=ids, expires_at__lte=now))
+        total += released
+        if not released or len(ids) < batch_size:  # done, or another sweeper holds the rest
+            return total
@@ -0,0 +1,135 @@
+# store/search.py
+"""
+Product search behind one interface: an FTS5 virtual table on SQLite, a
+stored tsvector with a GIN index on Postgres (both created by migration
+0010), and a plain LIKE scan anywhere else. Documents are the product
+title (weighted higher), description and variant attribute values; they
+are refreshed per product by store.signals and in bulk by rebuild_catalog.
+"""
+import re
+from abc import ABC, abstractmethod
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Product, Variant
+
+SQLITE_TABLE = "store_product_fts"
+POSTGRES_TABLE = "store_productsearch"
+
+
+def _terms(query):
+    return re.findall(r"\w+", query or "", flags=re.UNICODE)[:10]
+
+def _documents(product_ids):
+    """{product_id: (title, body)} in two queries."""
+    attrs = {}
+    for pid, a in Variant.objects.filter(product_id__in=product_ids).values_list("product_id", "attrs"):
+        attrs.setdefault(pid, set()).update(str(v) for v in (a or {}).values() if v)
+    return {
+        pid: (title, " ".join([description, *sorted(attrs.get(pid, ()))]))
+        for pid, title, description in Product.objects.filter(pk__in=product_ids).values_list("pk", "title", "description")
+    }
+
+
+class SearchBackend(ABC):
+    @abstractmethod
+    def index(self, product_ids):
+        """(Re)write the documents of these products; returns how many were written."""
+
+    @abstractmethod
+    def search(self, query, limit=50):
+        """Product ids, best match first."""
+
+
+class LikeBackend(SearchBackend):
+    def index(self, product_ids):
+        return 0
+
+    def search(self, query, limit=50):
+        terms = _terms(query)
+        if not terms:
+            return []
+        cond = Q()
+        for t in terms:
+            cond &= Q(title__icontains=t) | Q(description__icontains=t)
+        return list(Product.objects.filter(cond).order_by("-id").values_list("pk", flat=True)[:limit])
+
+
+class SQLiteFTSBackend(SearchBackend):
+    def index(self, product_ids):
+        product_ids = list(product_ids)
+        docs = _documents(product_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(product_ids))})", product_ids,
+            )
+            cursor.executemany(
+                f"INSERT INTO {SQLITE_TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+                [(pid, title, body) for pid, (title, body) in docs.items()],
+            )
+        return len(docs)
+
+    def search(self, query, limit=50):
+        terms = _terms(query)
+        if not terms:
+            return []
+        # quoted terms, implicitly AND'ed; only the last one (still being typed) is a prefix
+        match = " ".join([*(f'"{t}"' for t in terms[:-1]), f'"{terms[-1]}"*'])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s "
+                f"ORDER BY bm25({SQLITE_TABLE}, 10.0, 1.0) LIMIT %s",
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresBackend(SearchBackend):
+    def index(self, product_ids):
+        docs = _documents(list(product_ids))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {POSTGRES_TABLE} (product_id, document) VALUES "
+                f"(%s, setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')) "
+                f"ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+                [(pid, title, body) for pid, (title, body) in docs.items()],
+            )
+        return len(docs)
+
+    def search(self, query, limit=50):
+        terms = _terms(query)
+        if not terms:
+            return []
+        tsquery = " & ".join([*terms[:-1], f"{terms[-1]}:*"])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT product_id FROM {POSTGRES_TABLE}, to_tsquery('simple', %s) q "
+                f"WHERE document @@ q ORDER BY ts_rank(document, q) DESC LIMIT %s",
+                [tsquery, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+def _has_table(name):
+    return name in connection.introspection.table_names()
+
+_backend = None
+
+def backend() -> SearchBackend:
+    global _backend
+    if _backend is None:
+        if connection.vendor == "sqlite" and _has_table(SQLITE_TABLE):
+            _backend = SQLiteFTSBackend()
+        elif connection.vendor == "postgresql" and _has_table(POSTGRES_TABLE):
+            _backend = PostgresBackend()
+        else:
+            _backend = LikeBackend()
+    return _backend
+
+def index_products(product_ids):
+    product_ids = list(product_ids)
+    return backend().index(product_ids) if product_ids else 0
+
+def search_products(query, limit=50):
+    return backend().search(query, limit=limit)
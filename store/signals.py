@@ -0,0 +1,102 @@
+# store/signals.py
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import coupons
+from .catalog import product_changed
+from .search import index_products
+from .models import Product, ProductImage, Variant, VariantOption, Heart, ProductCard, Coupon, Cart
+from .pricing import bump_cart
+
+
+_state = threading.local()
+
+@contextmanager
+def catalog_signals_muted():
+    """For bulk writers that refresh cards/options/search themselves (store.importer)."""
+    _state.muted = True
+    try:
+        yield
+    finally:
+        _state.muted = False
+
+def _refresh_card(product_id):
+    # after commit, so cascaded deletes don't resurrect the card of a deleted product
+    transaction.on_commit(lambda: ProductCard.objects.refresh([product_id]))
+
+def _reindex(product_id):
+    transaction.on_commit(lambda: index_products([product_id]))
+
+def _touch_product(product_id):
+    _refresh_card(product_id)
+    transaction.on_commit(lambda: product_changed(product_id))
+
+
+# ---- ProductCard / detail payload cache ----
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        _refresh_card(instance.pk)
+    _reindex(instance.pk)
+    transaction.on_commit(lambda: product_changed(instance.pk))
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    _reindex(instance.pk)  # drops the document
+    transaction.on_commit(lambda: product_changed(instance.pk))
+
+@receiver(post_save, sender=Variant)
+@receiver(post_delete, sender=Variant)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def catalog_row_changed(sender, instance, raw=False, **kwargs):
+    if not raw and not getattr(_state, "muted", False):
+        _touch_product(instance.product_id)
+
+@receiver(post_save, sender=Variant)
+def variant_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        VariantOption.objects.sync([instance])
+        _reindex(instance.product_id)
+
+@receiver(post_delete, sender=Variant)
+def variant_deleted(sender, instance, **kwargs):
+    _reindex(instance.product_id)
+
+# hearts deliberately don't bump the catalog generation (a drop would thrash every
+# ETag); counts on CDN-cached anonymous pages catch up with the next catalog change
+@receiver(post_save, sender=Heart)
+def heart_added(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        if not ProductCard.objects.filter(pk=instance.product_id).update(hearts_count=F("hearts_count") + 1):
+            _refresh_card(instance.product_id)
+
+@receiver(post_delete, sender=Heart)
+def heart_removed(sender, instance, **kwargs):
+    ProductCard.objects.filter(pk=instance.product_id, hearts_count__gt=0).update(hearts_count=F("hearts_count") - 1)
+
+
+# ---- Coupon table ----
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+def coupon_changed(sender, **kwargs):
+    coupons.invalidate()
+
+
+# ---- Carts ----
+@receiver(user_logged_in)
+def merge_anonymous_cart(sender, request, user, **kwargs):
+    # session data survives login()'s key rotation, so the anonymous cart id is still here
+    cart_id = request.session.pop("cart_id", None) if request is not None else None
+    if cart_id:
+        cart = Cart.objects.merge_anonymous(cart_id, user)
+        if cart is not None:
+            bump_cart(cart.pk)
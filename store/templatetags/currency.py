@@ -15,3 +15,15 @@ def money_plain(cents):
         return ""
     s = f"{d:.2f}"
     return s.rstrip("0").rstrip(".")
+
+@register.filter
+def money(cents):
+    """
+    Render cents as 149.90 (always two decimals), no currency symbol.
+    Safe if cents is None/empty.
+    """
+    try:
+        d = Decimal(cents) / Decimal(100)
+    except Exception:
+        return ""
+    return f"{d:.2f}"
@@ -0,0 +1,353 @@
+import hashlib
+import hmac
+import json
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from store import webhooks
+from store.checkout import place_order
+from store.management.commands.explain_hot_queries import hot_queries
+from store.models import (Cart, CartItem, Order, Payment, Product, ProductCard, SalesRollup, StockHold, Variant,
+                          WebhookEvent)
+from store.reservations import OutOfStock, release, release_expired, reserve
+from store.search import index_products, search_products
+
+ADDRESS = {"full_name": "Test Buyer", "address_line": "Teststr. 1", "city": "Berlin", "postal_code": "10115"}
+
+
+def make_variants(*stocks, price=5000):
+    product = Product.objects.create(title="Test Sneaker", slug=f"test-sneaker-{Product.objects.count()}",
+                                     status=Product.ACTIVE)
+    return [Variant.objects.create(product=product, price_gross_cents=price, stock=stock,
+                                   attrs={"size": f"EU {40 + n}"}) for n, stock in enumerate(stocks)]
+
+def make_order(user, quantities):
+    """Place an order for {variant: qty} through the real checkout."""
+    cart = Cart.objects.get_or_create(user=user)[0]
+    CartItem.objects.add_variants(cart.pk, {v.pk: qty for v, qty in quantities.items()})
+    return place_order(cart, user, ADDRESS)
+
+
+class HotQueryPlanTests(TestCase):
+    """The indexes added for the hot queries must show up in their plans."""
+
+    def test_hot_queries_use_their_index(self):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")  # empty test tables always seq-scan
+        for label, qs, index in hot_queries():
+            if index is None:
+                continue
+            with self.subTest(label):
+                self.assertIn(index, qs.explain())
+
+    def test_command_passes(self):
+        out = StringIO()
+        call_command("explain_hot_queries", stdout=out)
+        self.assertIn("All hot queries use their indexes.", out.getvalue())
+
+    def test_command_fails_on_missing_index(self):
+        bogus = [("payment by status", Payment.objects.filter(status="paid"), "no_such_idx")]
+        with mock.patch("store.management.commands.explain_hot_queries.hot_queries", return_value=bogus):
+            with self.assertRaises(CommandError):
+                call_command("explain_hot_queries", stdout=StringIO())
+
+
+class SearchRankingTests(TestCase):
+    def test_old_title_match_beats_newer_body_matches(self):
+        jordan = Product.objects.create(title="Jordan Retro", slug="jordan-retro", status=Product.ACTIVE)
+        socks = Product.objects.bulk_create([
+            Product(title=f"Sock {n}", slug=f"sock-{n}", description="goes well with a jordan", status=Product.ACTIVE)
+            for n in range(1200)
+        ])
+        index_products([jordan.pk, *(p.pk for p in socks)])
+        self.assertEqual(search_products("jordan", limit=3)[0], jordan.pk)
+        self.assertEqual(search_products("jord")[0], jordan.pk)
+
+
+class StockTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="buyer")
+        self.a, self.b = make_variants(3, 1)
+
+    def stock(self):
+        return tuple(Variant.objects.filter(pk__in=[self.a.pk, self.b.pk]).order_by("pk").values_list("stock", flat=True))
+
+    def test_reserve_takes_stock_and_records_holds(self):
+        holds = reserve({self.a.pk: 2, self.b.pk: 1})
+        self.assertEqual(self.stock(), (1, 0))
+        self.assertEqual(sorted((h.variant_id, h.quantity) for h in holds), [(self.a.pk, 2), (self.b.pk, 1)])
+
+    def test_reserve_is_all_or_nothing(self):
+        with self.assertRaises(OutOfStock):
+            reserve({self.a.pk: 1, self.b.pk: 2})
+        self.assertEqual(self.stock(), (3, 1))
+        self.assertFalse(StockHold.objects.exists())
+
+    def test_last_unit_goes_once(self):
+        reserve({self.b.pk: 1})
+        with self.assertRaises(OutOfStock):
+            reserve({self.b.pk: 1})
+        self.assertEqual(self.stock(), (3, 0))
+
+    def test_release_returns_stock_and_deletes_holds(self):
+        reserve({self.a.pk: 2})
+        reserve({self.a.pk: 1, self.b.pk: 1})
+        self.assertEqual(release(StockHold.objects.all()), 3)
+        self.assertEqual(self.stock(), (3, 1))
+        self.assertFalse(StockHold.objects.exists())
+        self.assertEqual(release(StockHold.objects.all()), 0)
+
+    def test_release_expired_only_touches_expired_holds(self):
+        order = make_order(self.user, {self.a: 2})
+        reserve({self.b.pk: 1}, ttl=timedelta(hours=2))
+        later = timezone.now() + timedelta(hours=1)
+        self.assertEqual(release_expired(now=later), 1)
+        self.assertEqual(self.stock(), (3, 0))
+        self.assertEqual(Order.objects.get(pk=order.pk).holds_released_at, later)
+        self.assertEqual(release_expired(now=later), 0)
+
+    def test_display_stock_follows_reservations(self):
+        product_id = self.b.product_id
+        ProductCard.objects.refresh([product_id])
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve({self.b.pk: 1, self.a.pk: 3})
+        self.assertFalse(ProductCard.objects.get(pk=product_id).in_stock)
+        with self.captureOnCommitCallbacks(execute=True):
+            release(StockHold.objects.filter(variant=self.b))
+        self.assertEqual(ProductCard.objects.get(pk=product_id).total_stock, 1)
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="buyer")
+
+    def queries_for_order(self, lines):
+        variants = make_variants(*([5] * lines))
+        cart = Cart.objects.get_or_create(user=self.user)[0]
+        CartItem.objects.add_variants(cart.pk, {v.pk: 2 for v in variants})
+        with CaptureQueriesContext(connection) as ctx:
+            order = place_order(cart, self.user, ADDRESS)
+        self.assertEqual(order.items.count(), lines)
+        self.assertFalse(CartItem.objects.filter(cart=cart).exists())
+        return len(ctx.captured_queries)
+
+    def test_place_order_query_count_does_not_grow_with_cart(self):
+        self.assertEqual(self.queries_for_order(1), self.queries_for_order(8))
+
+    def test_place_order_reserves_and_snapshots(self):
+        a, b = make_variants(5, 5, price=11900)
+        order = make_order(self.user, {a: 2, b: 1})
+        self.assertEqual(order.gross_total, 3 * 11900)
+        self.assertEqual(order.net_total + order.vat_total, order.gross_total)
+        self.assertEqual(sorted(StockHold.objects.filter(order=order).values_list("quantity", flat=True)), [1, 2])
+        self.assertEqual(sorted(Variant.objects.filter(pk__in=[a.pk, b.pk]).values_list("stock", flat=True)), [3, 4])
+
+    def test_out_of_stock_checkout_changes_nothing(self):
+        a, = make_variants(1)
+        cart = Cart.objects.get_or_create(user=self.user)[0]
+        CartItem.objects.add_variants(cart.pk, {a.pk: 2})
+        with self.assertRaises(OutOfStock):
+            place_order(cart, self.user, ADDRESS)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.get(cart=cart).quantity, 2)
+
+
+class CartUpsertTests(TestCase):
+    def setUp(self):
+        self.a, self.b = make_variants(5, 5)
+        self.cart = Cart.objects.create()
+
+    def lines(self, cart):
+        return dict(CartItem.objects.filter(cart=cart).values_list("variant_id", "quantity"))
+
+    def test_add_variants_sums_onto_existing_lines(self):
+        self.assertEqual(CartItem.objects.add_variants(self.cart.pk, {self.a.pk: 2}), 1)
+        CartItem.objects.add_variants(self.cart.pk, {self.a.pk: 3, self.b.pk: 1, 999999: 4, self.b.pk + 1000: 0})
+        self.assertEqual(self.lines(self.cart), {self.a.pk: 5, self.b.pk: 1})
+
+    def test_copy_lines_sums_into_target(self):
+        target = Cart.objects.create()
+        CartItem.objects.add_variants(self.cart.pk, {self.a.pk: 2, self.b.pk: 1})
+        CartItem.objects.add_variants(target.pk, {self.a.pk: 1})
+        CartItem.objects.copy_lines(self.cart.pk, target.pk)
+        self.assertEqual(self.lines(target), {self.a.pk: 3, self.b.pk: 1})
+        self.assertEqual(self.lines(self.cart), {self.a.pk: 2, self.b.pk: 1})
+
+
+# recorded provider payloads (trimmed to the fields store.webhooks reads)
+STRIPE_COMPLETED = {
+    "id": "evt_1PqRsT2eZvKYlo2C0aBcDeFg", "object": "event", "type": "checkout.session.completed",
+    "data": {"object": {"id": "cs_test_a1B2c3", "object": "checkout.session", "payment_status": "paid"}},
+}
+STRIPE_EXPIRED = {
+    "id": "evt_1PqRsT2eZvKYlo2C0zYxWvUt", "object": "event", "type": "checkout.session.expired",
+    "data": {"object": {"id": "cs_test_a1B2c3", "object": "checkout.session", "payment_status": "unpaid"}},
+}
+COINBASE_CONFIRMED = {
+    "id": 1, "scheduled_for": "2026-10-01T12:00:00Z",
+    "event": {"id": "24934862-d980-46cb-9402-43c81b0cdba6", "type": "charge:confirmed",
+              "data": {"id": "f765421f-2248-4d1d-a6b5-ffe2d8a7a0e2", "code": "66BEOV2A"}},
+}
+COINBASE_RESOLVED = {
+    "id": 2, "scheduled_for": "2026-10-01T12:05:00Z",
+    "event": {"id": "5d4ba2e1-9b0a-4d53-8f4c-1b3c7e0c2f11", "type": "charge:resolved",
+              "data": {"id": "f765421f-2248-4d1d-a6b5-ffe2d8a7a0e2", "code": "66BEOV2A"}},
+}
+PAYPAL_COMPLETED = {
+    "id": "WH-2WR32451HC0233532-67976317FL4543714", "event_type": "PAYMENT.CAPTURE.COMPLETED",
+    "resource": {"id": "42311647XV020574X", "status": "COMPLETED",
+                 "supplementary_data": {"related_ids": {"order_id": "5O190127TN364715T"}}},
+}
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET="whsec_test", COINBASE_WEBHOOK_SECRET="cb_test",
+                   PAYPAL_WEBHOOK_TOKEN="pp_test")
+class WebhookTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="buyer", email="buyer@example.com")
+        self.variant, = make_variants(5)
+        self.order = make_order(self.user, {self.variant: 2})
+
+    def pay_with(self, provider, external_id):
+        return Payment.objects.create(order=self.order, provider=provider, external_id=external_id,
+                                      amount_cents=self.order.gross_total)
+
+    def stripe_post(self, payload, secret="whsec_test", ts=None):
+        body = json.dumps(payload).encode()
+        ts = str(ts or int(time.time()))
+        sig = hmac.new(secret.encode(), ts.encode() + b"." + body, hashlib.sha256).hexdigest()
+        return self.client.post("/webhooks/stripe/", body, content_type="application/json",
+                                HTTP_STRIPE_SIGNATURE=f"t={ts},v1={sig}")
+
+    # ---- verification ----
+    def test_stripe_signature(self):
+        self.assertEqual(self.stripe_post(STRIPE_COMPLETED).status_code, 200)
+        self.assertEqual(self.stripe_post(STRIPE_EXPIRED, secret="whsec_wrong").status_code, 400)
+        self.assertEqual(self.stripe_post(STRIPE_EXPIRED, ts=int(time.time()) - 3600).status_code, 400)
+        self.assertEqual(list(WebhookEvent.objects.values_list("event_id", flat=True)), [STRIPE_COMPLETED["id"]])
+
+    def test_coinbase_signature(self):
+        body = json.dumps(COINBASE_CONFIRMED).encode()
+        good = hmac.new(b"cb_test", body, hashlib.sha256).hexdigest()
+        for sig, status in ((good, 200), ("0" * 64, 400), ("", 400)):
+            response = self.client.post("/webhooks/coinbase/", body, content_type="application/json",
+                                        HTTP_X_CC_WEBHOOK_SIGNATURE=sig)
+            self.assertEqual(response.status_code, status)
+
+    def test_paypal_token(self):
+        body = json.dumps(PAYPAL_COMPLETED)
+        self.assertEqual(self.client.post("/webhooks/paypal/?token=pp_test", body,
+                                          content_type="application/json").status_code, 200)
+        self.assertEqual(self.client.post("/webhooks/paypal/?token=nope", body,
+                                          content_type="application/json").status_code, 400)
+
+    def test_unsigned_secret_rejects_everything(self):
+        with override_settings(STRIPE_WEBHOOK_SECRET=""):
+            self.assertEqual(self.stripe_post(STRIPE_COMPLETED, secret="").status_code, 400)
+
+    def test_duplicate_event_ids_are_dropped(self):
+        for _ in range(3):
+            self.assertEqual(self.stripe_post(STRIPE_COMPLETED).status_code, 200)
+        webhooks.store(Payment.STRIPE, STRIPE_COMPLETED)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    # ---- applying ----
+    def test_paid_event_marks_order_paid_and_keeps_stock_taken(self):
+        self.pay_with(Payment.STRIPE, "cs_test_a1B2c3")
+        webhooks.store(Payment.STRIPE, STRIPE_COMPLETED)
+        self.assertEqual(webhooks.process_pending(), 1)
+        self.order.refresh_from_db()
+        self.variant.refresh_from_db()
+        self.assertEqual(self.order.status, Order.PAID)
+        self.assertEqual(self.order.payment.status, Payment.PAID)
+        self.assertFalse(StockHold.objects.filter(order=self.order).exists())
+        self.assertEqual(self.variant.stock, 3)
+        self.assertFalse(self.order.needs_attention)
+
+    def test_failed_event_fails_order_and_returns_stock(self):
+        self.pay_with(Payment.STRIPE, "cs_test_a1B2c3")
+        webhooks.store(Payment.STRIPE, STRIPE_EXPIRED)
+        webhooks.process_pending()
+        self.order.refresh_from_db()
+        self.variant.refresh_from_db()
+        self.assertEqual(self.order.status, Order.FAILED)
+        self.assertEqual(self.order.payment.status, Payment.FAILED)
+        self.assertEqual(self.variant.stock, 5)
+
+    def test_event_before_payment_row_backs_off(self):
+        webhooks.store(Payment.PAYPAL, PAYPAL_COMPLETED)
+        webhooks.process_pending()
+        event = WebhookEvent.objects.get()
+        self.assertIsNone(event.processed_at)
+        self.assertGreater(event.next_attempt_at, timezone.now())
+        self.assertEqual(webhooks.process_pending(), 0)  # not due yet
+
+    def test_unparseable_event_is_parked(self):
+        WebhookEvent.objects.create(provider=Payment.STRIPE, event_id="evt_bad",
+                                    event_type="checkout.session.completed", payload={"data": []})
+        self.pay_with(Payment.STRIPE, "cs_test_a1B2c3")
+        webhooks.store(Payment.STRIPE, STRIPE_COMPLETED)
+        self.assertEqual(webhooks.process_pending(), 2)
+        self.assertIn("unparseable", WebhookEvent.objects.get(event_id="evt_bad").error)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, Order.PAID)
+
+    def test_replay_cannot_double_count_rollups(self):
+        self.pay_with(Payment.COINBASE, "f765421f-2248-4d1d-a6b5-ffe2d8a7a0e2")
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as fh:
+            for payload in (COINBASE_CONFIRMED, COINBASE_CONFIRMED, COINBASE_RESOLVED):
+                fh.write(json.dumps({"provider": Payment.COINBASE, "payload": payload}) + "\n")
+            fh.flush()
+            call_command("replay_webhooks", fh.name, "--process", stdout=StringIO())
+            call_command("replay_webhooks", fh.name, "--process", stdout=StringIO())
+        self.assertEqual(WebhookEvent.objects.count(), 2)
+        day = SalesRollup.objects.get(dimension=SalesRollup.DAY)
+        self.assertEqual((day.orders, day.quantity, day.gross_cents), (1, 2, self.order.gross_total))
+
+    # ---- late payment ----
+    def test_late_payment_takes_stock_again(self):
+        self.pay_with(Payment.STRIPE, "cs_test_a1B2c3")
+        release_expired(now=timezone.now() + timedelta(days=1))
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock, 5)
+        self.assertIsNotNone(Order.objects.get(pk=self.order.pk).holds_released_at)
+
+        webhooks.store(Payment.STRIPE, STRIPE_COMPLETED)
+        webhooks.process_pending()
+        self.variant.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual(self.variant.stock, 3)
+        self.assertEqual(self.order.status, Order.PAID)
+        self.assertFalse(self.order.needs_attention)
+        self.assertFalse(StockHold.objects.filter(order=self.order).exists())
+
+    def test_late_payment_without_stock_needs_attention(self):
+        self.pay_with(Payment.STRIPE, "cs_test_a1B2c3")
+        release_expired(now=timezone.now() + timedelta(days=1))
+        Variant.objects.filter(pk=self.variant.pk).update(stock=1)  # sold to someone else meanwhile
+        webhooks.store(Payment.STRIPE, STRIPE_COMPLETED)
+        webhooks.process_pending()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.PAID)
+        self.assertTrue(self.order.needs_attention)
+        self.assertEqual(Variant.objects.get(pk=self.variant.pk).stock, 1)
+
+    def test_paid_order_with_deleted_variant_needs_attention(self):
+        other, = make_variants(4)
+        order = make_order(self.user, {self.variant: 1, other: 1})
+        Payment.objects.create(order=order, provider=Payment.STRIPE, external_id="cs_test_a1B2c3")
+        StockHold.objects.filter(variant=other).delete()
+        other.delete()
+        webhooks.store(Payment.STRIPE, STRIPE_COMPLETED)
+        webhooks.process_pending()
+        self.assertTrue(Order.objects.get(pk=order.pk).needs_attention)
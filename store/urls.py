@@ -1,22 +1,33 @@
 # store/urls.py
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     # core pages
     path("", views.home, name="home"),
+    path("search/", views.search, name="search"),
     path("p/<slug:slug>/", views.product_detail, name="product_detail"),
+    path("heart/<int:product_id>/toggle/", views.heart_toggle, name="heart_toggle"),
+
+    # read-only catalog API
+    path("api/products/", api.product_list, name="api_product_list"),
+    path("api/products/<slug:slug>/", api.product_detail, name="api_product_detail"),
 
     # invites / auth
     path("invite/<str:token>/", views.invite, name="invite"),
     path("auth/signup/", views.signup_view, name="signup"),
     path("auth/login/", views.login_view, name="login"),
     path("auth/logout/", views.logout_view, name="logout"),
+    path("csrf/", views.csrf, name="csrf"),
     path("auth/verify/<str:token>/", views.verify_email, name="verify_email"),
+    path("qr/<str:token>/", views.qr_invite, name="qr_invite"),
+    path("qr/<str:token>.png", views.qr_image, {"fmt": "png"}, name="qr_png"),
+    path("qr/<str:token>.svg", views.qr_image, {"fmt": "svg"}, name="qr_svg"),
 
     # cart
     path("cart/", views.cart_view, name="cart"),
     path("cart/add/<int:variant_id>/", views.add_to_cart, name="add_to_cart"),
+    path("cart/add/bulk/", views.add_to_cart_bulk, name="add_to_cart_bulk"),
     path("cart/remove/<int:item_id>/", views.remove_from_cart, name="remove_from_cart"),
     path("coupon/apply/", views.apply_coupon, name="apply_coupon"),
     path("coupon/remove/", views.remove_coupon, name="remove_coupon"),
@@ -30,4 +41,11 @@ urlpatterns = [
     path("pay/paypal/capture/<str:order_id>/", views.paypal_capture_order, name="paypal_capture_order"),
     path("pay/coinbase/create/", views.coinbase_create_charge, name="coinbase_create_charge"),
     path("orders/success/<int:order_id>/", views.order_success, name="order_success"),
+    path("webhooks/stripe/", views.payment_webhook, {"provider": "stripe"}, name="stripe_webhook"),
+    path("webhooks/paypal/", views.payment_webhook, {"provider": "paypal"}, name="paypal_webhook"),
+    path("webhooks/coinbase/", views.payment_webhook, {"provider": "coinbase"}, name="coinbase_webhook"),
+
+    # accounting export (staff)
+    path("exports/orders.csv", views.export_orders, {"fmt": "csv"}, name="export_orders_csv"),
+    path("exports/orders.jsonl", views.export_orders, {"fmt": "jsonl"}, name="export_orders_jsonl"),
 ]
@@ -1,4 +1,7 @@
 from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import connections
 
 @dataclass
 class VatBreakdown:
@@ -8,13 +11,60 @@ class VatBreakdown:
     vat_rate: float
 
 def split_vat_from_gross(gross_cents: int, vat_rate: float) -> VatBreakdown:
-    # prices include VAT; compute net = gross / (1+rate)
-    net = round(gross_cents / (1 + vat_rate))
-    vat = gross_cents - net
-    return VatBreakdown(net=net, vat=vat, gross=gross_cents, vat_rate=vat_rate)
+    return split_vat_many([gross_cents], vat_rate)[0]
+
+def split_vat_many(gross_cents_list, vat_rate: float) -> list[VatBreakdown]:
+    # prices include VAT; net = gross / (1+rate), in integer maths (rate in basis
+    # points, half-up rounding) so every line of an order splits identically
+    denom = 10000 + round(vat_rate * 10000)
+    out = []
+    for gross in gross_cents_list:
+        net = (gross * 20000 + denom) // (2 * denom)
+        out.append(VatBreakdown(net=net, vat=gross - net, gross=gross, vat_rate=vat_rate))
+    return out
 
 def cents(amount: float) -> int:
     return int(round(amount * 100))
 
 def euro(cents_val: int) -> str:
     return f"{cents_val/100:,.2f} €".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def skip_locked(qs):
+    """FOR UPDATE SKIP LOCKED where the database has it (Postgres); unchanged elsewhere."""
+    if connections[qs.db].features.has_select_for_update_skip_locked:
+        return qs.select_for_update(skip_locked=True)
+    return qs
+
+def retry_backoff(attempts: int, base: int = 30, cap: int = 3600) -> timedelta:
+    """30s, 1m, 2m, 4m ... capped at an hour."""
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), cap))
+
+def keyset_page(qs, before=None, size: int = 48):
+    """
+    Page a queryset newest-first without OFFSET: rows with id < before.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    Works for model instances and for .values() dicts (which must include "id").
+    """
+    if before:
+        qs = qs.filter(id__lt=before)
+    rows = list(qs.order_by("-id")[:size + 1])
+    next_cursor = None
+    if len(rows) > size:
+        last = rows[size - 1]
+        next_cursor = last["id"] if isinstance(last, dict) else last.id
+    return rows[:size], next_cursor
+
+def encode_cart(cart: dict) -> str:
+    """{'12': 3, '7': 1} -> '12:3,7:1' (session/cookie friendly, a third of the JSON size)."""
+    return ",".join(f"{vid}:{qty}" for vid, qty in cart.items() if int(qty) > 0)
+
+def decode_cart(raw) -> dict:
+    """Inverse of encode_cart; also accepts the legacy dict shape and ignores junk."""
+    if isinstance(raw, dict):
+        return {str(k): int(v) for k, v in raw.items()}
+    cart = {}
+    for part in (raw or "").split(","):
+        vid, _, qty = part.partition(":")
+        if vid.isdigit() and qty.isdigit():
+            cart[vid] = int(qty)
+    return cart
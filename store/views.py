@@ -1,17 +1,40 @@
 # store/views.py
+import json
+from urllib.parse import quote
+
 from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse, JsonResponse
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseBadRequest, HttpResponseNotModified,
+    JsonResponse, StreamingHttpResponse,
+)
 from django.urls import reverse
-from django.views.decorators.csrf import csrf_protect, csrf_exempt
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import csrf_protect, csrf_exempt, ensure_csrf_cookie
+from django.views.decorators.http import require_POST
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.views.decorators.csrf import csrf_exempt
+from django.db import transaction
 from django.db.models import F
+from django.db.models.functions import Lower
+
+from . import coupons, exports, qr, webhooks
+from .catalog import product_payload
+from .checkout import EmptyCart, place_order
+from .facets import facet_counts, filter_products, parse_facets
+from .forms import AddressForm
+from .http import catalog_page
+from .pricing import bump_cart, compute_totals
+from .reservations import OutOfStock
+from .search import search_products
+from .utils import decode_cart, encode_cart, keyset_page
 
 # --- models (some may not exist; we degrade gracefully) ---
-from .models import Product
+from .models import Heart, Product, ProductCard, QRInvite
 try:
     from .models import Variant
 except Exception:
@@ -22,12 +45,6 @@ try:
 except Exception:
     Cart = CartItem = None  # session cart fallback
 
-# Optional coupon model (if you created it)
-try:
-    from .models import Coupon
-except Exception:
-    Coupon = None
-
 
 # =========================================
 # INVITES / AUTH
@@ -35,7 +52,10 @@ except Exception:
 
 
 def invite(request, token):
-    """Store the invite token and show signup."""
+    """Store the invite token and show signup. The use is consumed at signup."""
+    if not QRInvite.objects.valid().filter(token=token).exists():
+        messages.error(request, "This invite is invalid, used up or expired.")
+        return redirect("login")
     request.session["invite_token"] = token
     messages.info(request, "Invite verified. Please create your account.")
     return render(request, "auth_signup.html", {"invite_token": token})
@@ -50,11 +70,23 @@ def signup_view(request):
             messages.error(request, "Please enter a username and password.")
             return render(request, "auth_signup.html", {"prefill_username": username})
 
-        if User.objects.filter(username__iexact=username).exists():
+        # lower(username) is indexed (migration 0008); iexact would scan on SQLite
+        if User.objects.alias(username_lower=Lower("username")).filter(username_lower=username.lower()).exists():
             messages.error(request, "That username is already taken.")
             return render(request, "auth_signup.html", {"prefill_username": username})
 
-        user = User.objects.create_user(username=username, password=password)
+        token = request.session.get("invite_token")
+        with transaction.atomic():
+            user = User.objects.create_user(username=username, password=password)
+            if token and not QRInvite.objects.redeem(token, user):
+                transaction.set_rollback(True)
+                user = None
+        if user is None:
+            request.session.pop("invite_token", None)
+            messages.error(request, "This invite was used up or expired in the meantime.")
+            return render(request, "auth_signup.html", {"prefill_username": username})
+
+        request.session.pop("invite_token", None)
         login(request, user)
         messages.success(request, "Welcome! Your account was created.")
         return redirect("home")
@@ -78,6 +110,12 @@ def logout_view(request):
     messages.info(request, "Logged out.")
     return redirect("login")
 
+@never_cache
+@ensure_csrf_cookie
+def csrf(request):
+    """Token for pages served from the shared cache, which can't embed one."""
+    return JsonResponse({"token": get_token(request)})
+
 def verify_email(request, token: str):
     """Minimal email verification stub."""
     request.session["email_verified"] = True
@@ -89,76 +127,110 @@ def verify_email(request, token: str):
 # PAGES
 # =========================================
 
-def home(request):
-    products = Product.objects.all().order_by("-id")
-    return render(request, "home.html", {"products": products})
+CATALOG_PAGE_SIZE = 48
 
-def product_detail(request, slug):
-    p = get_object_or_404(Product, slug=slug)
-
-    # Normalize colors (avoid mismatch)
-    def normalize_color(c):
-        return (c or "One").strip().lower()
-
-    # --- Variants ---
-    variants = list(p.variants.all().order_by('price_gross_cents', 'id'))
-    colors = []
-    vmap = {}
-
-    for v in variants:
-        raw_color = (v.attrs or {}).get('color') or 'One'
-        color = normalize_color(raw_color)
-        size = (v.attrs or {}).get('size') or ''
-
-        if raw_color not in colors:  # keep original name for swatches
-            colors.append(raw_color)
-
-        vmap.setdefault(color, []).append({
-            'id': v.id,
-            'size': size,
-            'price': getattr(v, 'price_gross_cents', 0) or 0,
-            'stock': v.stock,
-        })
-
-    # --- Images ---
-    imap = {}
-    generic = []
-
-    for img in p.images.all().order_by('sort_order', 'id'):
-        payload = {'url': img.url, 'alt': img.alt or p.title}
-        if img.color:
-            imap.setdefault(normalize_color(img.color), []).append(payload)
-        else:
-            generic.append(payload)
+def _cursor(request, name="before"):
+    try:
+        return int(request.GET.get(name) or 0) or None
+    except ValueError:
+        return None
+
+@catalog_page
+def home(request):
+    selected = parse_facets(request.GET)
+    products, next_cursor = keyset_page(
+        filter_products(Product.objects.catalog_cards(), selected),
+        before=_cursor(request), size=CATALOG_PAGE_SIZE,
+    )
+    hearted = Heart.objects.hearted_ids(request.user, [p.pk for p in products])
+    next_query = request.GET.copy()
+    if next_cursor:
+        next_query["before"] = next_cursor
+    return render(request, "home.html", {
+        "products": products,
+        "next_query": next_query.urlencode() if next_cursor else "",
+        "hearted": hearted,
+        "facets": facet_counts(Product.objects.all(), selected, request.GET),
+    })
 
-    # Fallbacks
-    for c in [normalize_color(c) for c in colors] or ['one']:
-        if c not in imap:
-            imap[c] = generic if generic else [{
-                "url": "/static/img/placeholder.png",
-                "alt": "No image available",
-            }]
+@catalog_page
+def search(request):
+    query = (request.GET.get("q") or "").strip()
+    ids = search_products(query, limit=CATALOG_PAGE_SIZE) if query else []
+    found = Product.objects.catalog_cards().in_bulk(ids)
+    products = [found[pk] for pk in ids if pk in found]  # keep rank order
+    return render(request, "home.html", {
+        "products": products,
+        "query": query,
+        "hearted": Heart.objects.hearted_ids(request.user, ids),
+    })
 
+@catalog_page
+def product_detail(request, slug):
+    p = get_object_or_404(Product.objects.only("id", "title", "slug", "description"), slug=slug)
+    payload = product_payload(p)
     return render(request, 'product_detail.html', {
         'p': p,
-        'colors': colors or ['One'],     # original names for buttons
-        'variant_map': vmap,             # normalized keys
-        'images_map': imap,              # normalized keys
+        'hero': payload['hero'],
+        'colors': payload['colors'],                       # original names for buttons
+        'variant_map_json': payload['variant_map_json'],   # normalized keys, pre-serialized
+        'images_map_json': payload['images_map_json'],
     })
 
 
+# =========================================
+# HEARTS
+# =========================================
+
+@require_POST
+def heart_toggle(request, product_id: int):
+    """JSON for the .heart buttons in base.html: {"hearted": bool, "count": int}."""
+    if not request.user.is_authenticated:
+        return JsonResponse({"ok": False, "error": "Login required"}, status=401)
+    if not Product.objects.filter(pk=product_id).exists():
+        raise Http404("No such product.")
+    hearted = Heart.objects.toggle(request.user, product_id)
+    count = ProductCard.objects.filter(pk=product_id).values_list("hearts_count", flat=True).first() or 0
+    return JsonResponse({"ok": True, "hearted": hearted, "count": count})
+
+
 # =========================================
 # QR INVITES
 # =========================================
 
 
-from django.conf import settings
-from django.shortcuts import render
+def _invite_target(request, token):
+    base = getattr(settings, "PUBLIC_BASE_URL", request.build_absolute_uri("/")).rstrip("/")
+    return f"{base}/invite/{token}"
 
 def qr_invite(request, token):
-    base = getattr(settings, "PUBLIC_BASE_URL", request.build_absolute_uri("/")).rstrip("/")
-    target = f"{base}/invite/{token}"
-    return render(request, "qr_invite.html", {"target_url": target})
+    return render(request, "qr_invite.html", {
+        "target_url": _invite_target(request, token),
+        "token": token,
+    })
+
+def qr_image(request, token, fmt="png"):
+    """The invite QR as PNG/SVG, rendered once into the disk cache and cached forever by clients."""
+    target = _invite_target(request, token)
+    if qr.qrcode is None:
+        return redirect(f"https://api.qrserver.com/v1/create-qr-code/?size=240x240&data={quote(target)}")
+
+    digest = qr.qr_digest(target, fmt)
+    path = qr.cached_path(digest, fmt)
+    if not path.exists():
+        # only spend CPU/disk on tokens that exist
+        if not QRInvite.objects.filter(token=token).exists():
+            raise Http404("Unknown invite.")
+        path, digest = qr.qr_file(target, fmt)
+
+    etag = f'"{digest}"'
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(path, "rb"), content_type=qr.CONTENT_TYPES[fmt])
+    response["ETag"] = etag
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
 
 
 # =========================================
@@ -171,63 +243,87 @@ def _has_db_cart():
 
 def _get_cart_session_dict(request):
     """Session cart shape: {'1': qty, '7': qty, ...} (keys are variant IDs as str)."""
-    cart = request.session.get("cart", {})
-    if not isinstance(cart, dict):
-        cart = {}
-    return cart
+    return decode_cart(request.session.get("cart"))
 
 def _save_cart_session_dict(request, cart):
-    request.session["cart"] = cart
-    request.session.modified = True
-
-def _get_cart(request):
-    """Return a DB cart if models exist; else None (session mode)."""
-    if not _has_db_cart():
-        return None
+    # stored compact ("1:2,7:1"); only dirty the session when the cart really changed
+    encoded = encode_cart(cart)
+    if request.session.get("cart") != encoded:
+        request.session["cart"] = encoded
 
+def _get_cart(request, create=False):
+    """
+    Return the DB cart, or None if there isn't one yet. Carts are only created
+    on first write (create=True), so browsing and viewing an empty cart never
+    inserts rows. Anonymous carts are referenced from the session.
+    """
     if request.user.is_authenticated:
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-    else:
-        # if your Cart model has a session_key field, use it; otherwise
-        # just create a single cart per anonymous session by pk
-        cid = request.session.get("cart_id")
-        if cid:
-            try:
-                cart = Cart.objects.get(pk=cid)
-            except Cart.DoesNotExist:
-                cart = Cart.objects.create()
-                request.session["cart_id"] = cart.pk
-        else:
-            cart = Cart.objects.create()
-            request.session["cart_id"] = cart.pk
+        if create:
+            return Cart.objects.get_or_create(user=request.user)[0]
+        return Cart.objects.filter(user=request.user).first()
+
+    cid = request.session.get("cart_id")
+    cart = Cart.objects.filter(pk=cid, user__isnull=True).first() if cid else None
+    if cart is None and create:
+        cart = Cart.objects.create()
+        request.session["cart_id"] = cart.pk
     return cart
 
-def add_to_cart(request, variant_id: int):
-    """Add one unit of the variant to cart."""
+def _add_quantities(request, quantities):
+    """Add {variant_id: qty} to the current cart; returns how many lines were touched."""
     if _has_db_cart():
-        cart = _get_cart(request)
-        v = get_object_or_404(Variant, pk=variant_id)
-        item, created = CartItem.objects.get_or_create(cart=cart, variant=v, defaults={"quantity": 1})
-        if not created:
-            item.quantity += 1
-            item.save()
-    else:
-        # session fallback
-        cart = _get_cart_session_dict(request)
-        key = str(variant_id)
-        cart[key] = cart.get(key, 0) + 1
-        _save_cart_session_dict(request, cart)
+        cart = _get_cart(request, create=True)
+        added = CartItem.objects.add_variants(cart.pk, quantities)
+        bump_cart(cart.pk)
+        return added
+    # session fallback
+    cart = _get_cart_session_dict(request)
+    for vid, qty in quantities.items():
+        key = str(vid)
+        cart[key] = cart.get(key, 0) + qty
+    _save_cart_session_dict(request, cart)
+    return len(quantities)
 
+def add_to_cart(request, variant_id: int):
+    """Add one unit of the variant to cart."""
+    if not _add_quantities(request, {variant_id: 1}):
+        raise Http404("No such variant.")
     messages.success(request, "Added to cart.")
     return redirect("cart")
 
+BULK_ADD_MAX_LINES = 50
+BULK_ADD_MAX_QTY = 99
+
+@require_POST
+def add_to_cart_bulk(request):
+    """
+    JSON: {"items": [{"variant_id": 1, "quantity": 2}, ...]}
+    Adds every line in one upsert; repeated variant ids are summed.
+    """
+    try:
+        items = json.loads(request.body or b"{}").get("items") or []
+        if not isinstance(items, list) or len(items) > BULK_ADD_MAX_LINES:
+            raise ValueError
+        quantities = {}
+        for line in items:
+            vid, qty = int(line["variant_id"]), int(line.get("quantity", 1))
+            if not 0 < qty <= BULK_ADD_MAX_QTY:
+                raise ValueError
+            quantities[vid] = quantities.get(vid, 0) + qty
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return JsonResponse({"ok": False, "error": "Invalid items."}, status=400)
+
+    added = _add_quantities(request, quantities)
+    return JsonResponse({"ok": True, "added": added, "skipped": len(quantities) - added})
+
 def remove_from_cart(request, item_id: int):
     """Remove an item. In DB-mode item_id is CartItem PK; in session-mode it is variant_id."""
     if _has_db_cart():
-        try:
-            CartItem.objects.filter(pk=item_id).delete()
+        cart = _get_cart(request)
+        if cart and CartItem.objects.filter(pk=item_id, cart=cart).delete()[0]:
+            bump_cart(cart.pk)
             messages.info(request, "Item removed.")
-        except Exception:
+        else:
             messages.error(request, "Could not remove item.")
     else:
         cart = _get_cart_session_dict(request)
@@ -238,41 +334,22 @@ def remove_from_cart(request, item_id: int):
             messages.info(request, "Item removed.")
     return redirect("cart")
 
-def _apply_coupon_if_any(request, cents_subtotal):
-    """
-    Returns (discount_cents, applied_coupon_or_None).
-    Works if you have a Coupon model with:
-      - objects.valid() queryset method and
-      - discount_amount(subtotal_cents) -> cents
-    Otherwise, it safely applies nothing.
-    """
-    code = (request.session.get("coupon_code") or "").strip()
-    if not code or not Coupon:
-        return 0, None
-    try:
-        qs = getattr(Coupon.objects, "valid", lambda: Coupon.objects).callable if hasattr(Coupon.objects, "valid") else Coupon.objects
-    except Exception:
-        qs = Coupon.objects
-
-    try:
-        # prefer a .valid() queryset if you built it; else plain get()
-        try:
-            valid_qs = Coupon.objects.valid()
-        except Exception:
-            valid_qs = Coupon.objects.all()
-        coupon = valid_qs.get(code__iexact=code)
-        if hasattr(coupon, "discount_amount"):
-            return coupon.discount_amount(cents_subtotal), coupon
-        # simple fallback: 10% off if percent_off exists
-        if hasattr(coupon, "percent_off") and coupon.percent_off:
-            return int(cents_subtotal * (coupon.percent_off / 100.0)), coupon
-        if hasattr(coupon, "amount_off_cents") and coupon.amount_off_cents:
-            return min(coupon.amount_off_cents, cents_subtotal), coupon
-        return 0, coupon
-    except Exception:
-        # invalid/expired -> drop it
+def _session_coupon(request):
+    """The valid coupon for the session's promo code; invalid/expired codes are dropped."""
+    code = request.session.get("coupon_code")
+    if not code:
+        return None
+    coupon = coupons.lookup(code)
+    if coupon is None:
         request.session.pop("coupon_code", None)
+    return coupon
+
+def _apply_coupon_if_any(request, cents_subtotal):
+    """Returns (discount_cents, applied_coupon_or_None)."""
+    coupon = _session_coupon(request)
+    if coupon is None:
         return 0, None
+    return coupon.discount_amount(cents_subtotal), coupon
 
 def apply_coupon(request):
     """POST endpoint to apply a promo code (stored in session)."""
@@ -282,7 +359,6 @@ def apply_coupon(request):
             messages.error(request, "Enter a promo code.")
         else:
             request.session["coupon_code"] = code
-            request.session.modified = True
             # We validate in cart_view so bad codes clean themselves up
             messages.success(request, "Promo code applied.")
     return redirect("cart")
@@ -290,25 +366,20 @@ def apply_coupon(request):
 def cart_view(request):
     """
     Build a cart context that the template expects:
-      items: each has .variant (with .product), .quantity, .unit (€, float), .line (€, float)
-      net, vat, gross (floats in €)
-      discount (float €) + applied_coupon (optional)
+      items: each has .variant (with .product), .quantity, .unit_cents, .line_cents
+      totals: pricing.CartTotals (integer cents) + applied_coupon (optional)
     """
     items = []
-    cents_subtotal = 0
 
     if _has_db_cart():
         cart = _get_cart(request)
         db_items = (CartItem.objects
                     .filter(cart=cart)
-                    .select_related("variant", "variant__product"))
+                    .select_related("variant", "variant__product")) if cart else []
         for it in db_items:
-            unit_cents = getattr(it.variant, "price_gross_cents", 0) or 0
-            line_cents = unit_cents * it.quantity
-            it.unit = unit_cents / 100.0
-            it.line = line_cents / 100.0
+            it.unit_cents = it.variant.price_gross_cents or 0
+            it.line_cents = it.unit_cents * it.quantity
             items.append(it)
-            cents_subtotal += line_cents
     else:
         # session fallback
         sess = _get_cart_session_dict(request)
@@ -320,45 +391,28 @@ def cart_view(request):
             v = variants_by_id.get(vid)
             if not v:
                 continue
-            unit_cents = getattr(v, "price_gross_cents", 0) or 0
-            line_cents = unit_cents * qty
             # lightweight item mimic
             class _I:
                 pass
             it = _I()
             it.variant = v
             it.quantity = qty
-            it.unit = unit_cents / 100.0
-            it.line = line_cents / 100.0
+            it.unit_cents = v.price_gross_cents or 0
+            it.line_cents = it.unit_cents * qty
             # add a pseudo id so "remove" link can work (uses variant_id in session mode)
             it.id = vid
             items.append(it)
-            cents_subtotal += line_cents
+
+    # from the lines just loaded, so the totals always match what the page lists
+    cents_subtotal = sum(it.line_cents for it in items)
+    count = sum(it.quantity for it in items)
 
     # promo code
     discount_cents, applied_coupon = _apply_coupon_if_any(request, cents_subtotal)
-    cents_after_discount = max(0, cents_subtotal - discount_cents)
-
-    # VAT maths
-    vat_rate = float(getattr(settings, "GERMANY_STANDARD_VAT", 0.19))
-    prices_include_vat = bool(getattr(settings, "PRICES_INCLUDE_VAT", True))
-
-    if prices_include_vat:
-        gross = cents_after_discount / 100.0
-        net = gross / (1 + vat_rate) if (1 + vat_rate) else gross
-        vat = gross - net
-    else:
-        net = cents_after_discount / 100.0
-        vat = net * vat_rate
-        gross = net + vat
 
     ctx = {
         "items": items,
-        "net": net,
-        "vat": vat,
-        "gross": gross,
-        "vat_rate": vat_rate * 100.0,  # percent for display
-        "discount": (discount_cents / 100.0) if discount_cents else 0.0,
+        "totals": compute_totals(cents_subtotal, discount_cents, count=count),
         "applied_coupon": applied_coupon,
     }
     return render(request, "cart.html", ctx)
@@ -369,10 +423,23 @@ def cart_view(request):
 # =========================================
 
 def checkout_view(request):
-    try:
-        return render(request, "checkout.html")
-    except Exception:
-        return HttpResponse("Checkout coming soon.", content_type="text/plain")
+    """Address form -> Order snapshot of the cart (stock is held until payment)."""
+    if not request.user.is_authenticated:
+        return redirect(f"{reverse('login')}?next={reverse('checkout')}")
+
+    address_form = AddressForm(request.POST or None)
+    if request.method == "POST" and address_form.is_valid():
+        try:
+            order = place_order(_get_cart(request), request.user, address_form.cleaned_data,
+                                coupon=_session_coupon(request))
+        except EmptyCart:
+            messages.error(request, "Your cart is empty.")
+            return redirect("cart")
+        except OutOfStock:
+            messages.error(request, "Sorry, some items just sold out. Please review your cart.")
+            return redirect("cart")
+        return render(request, "checkout.html", {"order": order})
+    return render(request, "checkout.html", {"address_form": address_form})
 
 @csrf_exempt
 def stripe_create_checkout(request):
@@ -398,11 +465,39 @@ def paypal_capture_order(request, order_id: str):
 def coinbase_create_charge(request):
     return JsonResponse({"ok": False, "error": "Coinbase not wired yet"}, status=400)
 
+@csrf_exempt
+@require_POST
+def payment_webhook(request, provider):
+    """Verify, store, 200. Orders are updated by `manage.py process_webhooks`."""
+    try:
+        webhooks.receive(provider, request)
+    except webhooks.InvalidWebhook as exc:
+        return JsonResponse({"ok": False, "error": str(exc)}, status=400)
+    return JsonResponse({"ok": True})
+
 def order_success(request, order_id: int):
     return HttpResponse(f"Order {order_id} placed. (placeholder)", content_type="text/plain")
 
 def remove_coupon(request):
     request.session.pop("coupon_code", None)
-    request.session.modified = True
     messages.info(request, "Promo code removed.")
     return redirect("cart")
+
+
+# =========================================
+# ACCOUNTING EXPORT (staff only)
+# =========================================
+
+@staff_member_required
+def export_orders(request, fmt):
+    """?from=YYYY-MM-DD&to=YYYY-MM-DD&status=paid, streamed in constant memory."""
+    try:
+        start = exports.parse_day(request.GET["from"]) if request.GET.get("from") else None
+        end = exports.parse_day(request.GET["to"], end=True) if request.GET.get("to") else None
+    except ValueError:
+        return HttpResponseBadRequest("Dates must be YYYY-MM-DD.")
+    orders = exports.orders_between(start, end, status=request.GET.get("status") or None)
+    response = StreamingHttpResponse(exports.stream(fmt, orders), content_type=exports.FORMATS[fmt])
+    response["Content-Disposition"] = f'attachment; filename="orders.{fmt}"'
+    response["Cache-Control"] = "private, no-store"
+    return response
@@ -0,0 +1,232 @@
+# store/webhooks.py
+"""
+Payment webhooks: verify, store, acknowledge; apply later.
+
+The request path only checks the signature and INSERTs a WebhookEvent
+(ON CONFLICT DO NOTHING on (provider, event_id)), so provider retries and
+retry storms cost one small write each and never touch orders or stock.
+process_pending() — run by `manage.py process_webhooks` — claims due
+events in batches, looks their payments up in one query and applies
+them; an event that can't be applied yet backs off via next_attempt_at.
+Applying is idempotent: Order.mark_paid() is a conditional transition, so
+an event processed twice cannot double-count a payment.
+
+Signatures:
+  * Stripe: Stripe-Signature "t=<ts>,v1=<hex>", HMAC-SHA256 of "<ts>.<body>"
+    with STRIPE_WEBHOOK_SECRET, timestamp within STRIPE_TOLERANCE seconds.
+  * Coinbase Commerce: X-CC-Webhook-Signature, HMAC-SHA256 of the body
+    with COINBASE_WEBHOOK_SECRET.
+  * PayPal signs with certificates that can only be checked online, so the
+    webhook URL carries a shared secret (?token=PAYPAL_WEBHOOK_TOKEN) instead.
+"""
+import hashlib
+import hmac
+import json
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Order, Payment, StockHold, WebhookEvent
+from .reservations import release, settle
+from .utils import retry_backoff, skip_locked
+
+STRIPE_TOLERANCE = 300
+MAX_ATTEMPTS = 10  # an event whose payment never shows up is parked after this many tries
+
+PAID, FAILED = "paid", "failed"
+ACTIONS = {
+    Payment.STRIPE: {
+        "checkout.session.completed": PAID,
+        "checkout.session.async_payment_succeeded": PAID,
+        "checkout.session.async_payment_failed": FAILED,
+        "checkout.session.expired": FAILED,
+    },
+    Payment.PAYPAL: {
+        "PAYMENT.CAPTURE.COMPLETED": PAID,
+        "PAYMENT.CAPTURE.DENIED": FAILED,
+        "CHECKOUT.ORDER.VOIDED": FAILED,
+    },
+    Payment.COINBASE: {
+        "charge:confirmed": PAID,
+        "charge:resolved": PAID,
+        "charge:failed": FAILED,
+    },
+}
+
+
+class InvalidWebhook(Exception):
+    pass
+
+
+# =========================================
+# VERIFY + PARSE
+# =========================================
+
+def _hmac_hex(secret, message: bytes):
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+def verify_stripe(body: bytes, header: str, secret: str, now=None):
+    if not secret:
+        raise InvalidWebhook("STRIPE_WEBHOOK_SECRET is not set")
+    parts = [p.split("=", 1) for p in (header or "").split(",") if "=" in p]
+    timestamps = [v for k, v in parts if k == "t"]
+    signatures = [v for k, v in parts if k == "v1"]
+    if not timestamps or not signatures or not timestamps[0].isdigit():
+        raise InvalidWebhook("malformed Stripe-Signature")
+    if abs((now or time.time()) - int(timestamps[0])) > STRIPE_TOLERANCE:
+        raise InvalidWebhook("timestamp outside tolerance")
+    expected = _hmac_hex(secret, timestamps[0].encode() + b"." + body)
+    if not any(hmac.compare_digest(expected, s) for s in signatures):
+        raise InvalidWebhook("bad signature")
+
+def verify_coinbase(body: bytes, header: str, secret: str):
+    if not secret:
+        raise InvalidWebhook("COINBASE_WEBHOOK_SECRET is not set")
+    if not hmac.compare_digest(_hmac_hex(secret, body), header or ""):
+        raise InvalidWebhook("bad signature")
+
+def verify_paypal(token: str, secret: str):
+    if not secret:
+        raise InvalidWebhook("PAYPAL_WEBHOOK_TOKEN is not set")
+    if not hmac.compare_digest(secret, token or ""):
+        raise InvalidWebhook("bad token")
+
+def verify(provider, request):
+    if provider == Payment.STRIPE:
+        verify_stripe(request.body, request.headers.get("Stripe-Signature"), settings.STRIPE_WEBHOOK_SECRET)
+    elif provider == Payment.COINBASE:
+        verify_coinbase(request.body, request.headers.get("X-CC-Webhook-Signature"),
+                        settings.COINBASE_WEBHOOK_SECRET)
+    elif provider == Payment.PAYPAL:
+        verify_paypal(request.GET.get("token"), settings.PAYPAL_WEBHOOK_TOKEN)
+    else:
+        raise InvalidWebhook(f"unknown provider {provider!r}")
+
+def describe(provider, payload):
+    """(event_id, event_type, payment external_id) of a provider payload."""
+    try:
+        if provider == Payment.STRIPE:
+            return _checked(payload["id"], payload["type"], payload["data"]["object"].get("id", ""))
+        if provider == Payment.PAYPAL:
+            resource = payload.get("resource") or {}
+            order_id = ((resource.get("supplementary_data") or {}).get("related_ids") or {}).get("order_id")
+            return _checked(payload["id"], payload["event_type"], order_id or resource.get("id", ""))
+        if provider == Payment.COINBASE:
+            event = payload["event"]
+            return _checked(event["id"], event["type"], event["data"].get("id", ""))
+    except (KeyError, TypeError, AttributeError):
+        pass
+    raise InvalidWebhook("unrecognised payload")
+
+def _checked(event_id, event_type, external_id):
+    if not isinstance(event_id, (str, int)) or not isinstance(event_type, str) or not isinstance(external_id, str):
+        raise TypeError
+    return str(event_id), event_type, external_id
+
+
+# =========================================
+# INBOX
+# =========================================
+
+def store(provider, payload):
+    """Insert the event unless we already have it (retries are dropped by the unique constraint)."""
+    event_id, event_type, _ = describe(provider, payload)
+    WebhookEvent.objects.bulk_create(
+        [WebhookEvent(provider=provider, event_id=event_id[:200], event_type=event_type[:100], payload=payload)],
+        ignore_conflicts=True,
+    )
+
+def receive(provider, request):
+    """Verify and store one webhook request; raises InvalidWebhook."""
+    verify(provider, request)
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        raise InvalidWebhook("body is not JSON")
+    store(provider, payload)
+
+
+# =========================================
+# WORKER
+# =========================================
+
+def payments_matching(keys):
+    """
+    Payments for (provider, external_id) keys, in one query. Each branch
+    repeats the partial unique index's condition (external_id != '') so the
+    planner can use store_payment_provider_external_uniq.
+    """
+    by_provider = {}
+    for provider, external_id in keys:
+        if external_id:
+            by_provider.setdefault(provider, set()).add(external_id)
+    if not by_provider:
+        return Payment.objects.none()
+    q = Q()
+    for provider, ids in by_provider.items():
+        q |= Q(provider=provider, external_id__in=ids) & ~Q(external_id="")
+    return Payment.objects.filter(q)
+
+def _payments_for(keys):
+    """{(provider, external_id): Payment} for all keys, in one query."""
+    return {(p.provider, p.external_id): p for p in payments_matching(keys).select_related("order")}
+
+def apply(event, payment, now):
+    action = ACTIONS[event.provider].get(event.event_type)
+    order = payment.order
+    if action == PAID:
+        Payment.objects.filter(pk=payment.pk).update(status=Payment.PAID, raw=event.payload)
+        if order.mark_paid(when=now):
+            settle(order)  # re-takes stock if the holds already expired
+    elif action == FAILED:
+        Payment.objects.filter(pk=payment.pk).exclude(status=Payment.PAID).update(status=Payment.FAILED, raw=event.payload)
+        if Order.objects.filter(pk=order.pk, status=Order.NEW).update(status=Order.FAILED):
+            release(StockHold.objects.filter(order=order))
+
+def _retry_later(event, now, error):
+    """Back off like store.jobs; park the event once it runs out of attempts."""
+    event.error = error[:2000]
+    if event.attempts >= MAX_ATTEMPTS:
+        event.processed_at = now
+    else:
+        event.next_attempt_at = now + retry_backoff(event.attempts, base=10)
+
+def process_pending(batch_size=100):
+    """Apply one batch of due events. Returns the number of events looked at."""
+    now = timezone.now()
+    due = WebhookEvent.objects.filter(processed_at__isnull=True, next_attempt_at__lte=now)
+    with transaction.atomic():
+        events = list(skip_locked(due.order_by("next_attempt_at", "id"))[:batch_size])
+        if not events:
+            return 0
+        described = {}
+        for event in events:
+            try:
+                described[event.pk] = describe(event.provider, event.payload)
+            except InvalidWebhook:
+                pass  # parked below; retrying won't make it parse
+        payments = _payments_for((e.provider, described[e.pk][2]) for e in events if e.pk in described)
+        for event in events:
+            event.attempts += 1
+            if event.pk not in described:
+                event.processed_at, event.error = now, f"unparseable {event.provider} payload"
+                continue
+            if event.event_type not in ACTIONS.get(event.provider, {}):
+                event.processed_at, event.error = now, ""  # not an event we act on
+                continue
+            payment = payments.get((event.provider, described[event.pk][2]))
+            if payment is None:
+                # the webhook can beat our own Payment commit; try again later
+                _retry_later(event, now, f"no payment with external id {described[event.pk][2]!r}")
+                continue
+            try:
+                with transaction.atomic():  # savepoint: one bad event doesn't sink the batch
+                    apply(event, payment, now)
+                event.processed_at, event.error = now, ""
+            except Exception as exc:
+                _retry_later(event, now, repr(exc))
+        WebhookEvent.objects.bulk_update(events, ["processed_at", "attempts", "error", "next_attempt_at"])
+    return len(events)